@@ -0,0 +1,979 @@
+"""
+support library for dictionary manipulation - see dicjsontools
+- path queries (extraction)
+- merge, diff & patch
+- nested, flat & columnar forms
+"""
+
+import re
+from bisect import bisect_left
+from collections.abc import Iterator, Mapping, MutableMapping, Sequence
+from functools import lru_cache
+
+from vbrpytools import exceptions as vbrExceptions
+
+
+
+def sub_dict(input_dict, master_key, sub_keys : list = None):
+    """ Retrieve a subdict of a given dic "master" key
+        If no input list, retrieve all keys
+
+        @args:
+        input_dict -- input dictionary - or FlatDict, the subdict being then a FlatDict
+        master_key -- str
+                      the master key to retrieve the subdict from
+        sub_keys   -- [.] -- []
+                      list of keys to retrieve
+    """
+    if isinstance(input_dict, FlatDict):
+        master_dict = input_dict.sub(str(master_key))
+        if sub_keys is None or sub_keys == []:
+            return master_dict
+        sub_keys = {str(key) for key in sub_keys}
+        return FlatDict((k, v) for k, v in master_dict.items() if k.partition('.')[0] in sub_keys)
+
+    master_dict = input_dict[master_key]
+    if sub_keys is None or sub_keys == []:
+        sub_dic = master_dict
+    else:
+        sub_keys = set(sub_keys)
+        sub_dic = {k: v for k, v in master_dict.items() if k in sub_keys}
+    return sub_dic
+
+
+# path query components: wildcard (see select())
+_QUERY_ANY = '*'
+_QUERY_PATH = re.compile(r'(?:[^.\[\]]+|\[(?:\d+|\*)\])(?:\.[^.\[\]]+|\[(?:\d+|\*)\])*')
+_QUERY_COMPONENT = re.compile(r'([^.\[\]]+)|\[(\d+|\*)\]')
+
+
+def _parse_query(path):
+    """Get the components of a path query: keys, integers (keys or list indexes) & wildcards
+    """
+    if not isinstance(path, str):
+        return list(path)
+    if not _QUERY_PATH.fullmatch(path):
+        raise vbrExceptions.OtherException('Invalid path query:', path)
+    return [int(component) if component.isdecimal() else component
+            for key, index in _QUERY_COMPONENT.findall(path) for component in (key or index,)]
+
+
+class _QueryNode():
+    """Node of compiled path queries
+        end:    True if a path ends here: the whole value is selected
+        keys:   {key: _QueryNode of the value of this key}, including the paths of the wildcard
+                (integers & keys made of the same digits match the same node)
+        any:    _QueryNode of the values of other keys - None if no wildcard
+        indexes: integer keys, sorted: list items to match, in list order
+    """
+    __slots__ = ('end', 'keys', 'any', 'indexes')
+
+    def __init__(self, trie):
+        """Compile a trie {component: sub trie, None: end of path}
+        """
+        self.end = None in trie
+        any_trie = trie.get(_QUERY_ANY)
+        self.any = _QueryNode(any_trie) if any_trie is not None else None
+        self.keys = {}
+        for component, sub_trie in trie.items():
+            if component is None or component == _QUERY_ANY:
+                continue
+            node = _QueryNode(_merge_tries(sub_trie, any_trie) if any_trie is not None else sub_trie)
+            self.keys[component] = node
+            if isinstance(component, int):
+                self.keys.setdefault(str(component), node)
+            elif isinstance(component, str) and component.isdecimal():
+                self.keys.setdefault(int(component), node)
+        self.indexes = sorted(key for key in self.keys if isinstance(key, int))
+
+
+def _merge_tries(trie_a, trie_b):
+    """Merge 2 query tries, e.g. the sub tries of a key & of the wildcard
+    """
+    merged = dict(trie_a)
+    for component, sub_trie in trie_b.items():
+        merged[component] = _merge_tries(merged[component], sub_trie) if component in merged else sub_trie
+    return merged
+
+
+@lru_cache(maxsize = 256)
+def _cached_query(paths):
+    trie = {}
+    for path in paths:
+        node = trie
+        for component in _parse_query(path):
+            node = node.setdefault(component, {})
+        node[None] = {}
+    return _QueryNode(trie)
+
+
+def _compile_query(paths):
+    """Compile path queries once (then cached) into a tree of _QueryNode,
+    so that all paths are matched in a single traversal
+    """
+    return _cached_query(tuple(path if isinstance(path, str) else tuple(path) for path in paths))
+
+
+def _query_items(data, node):
+    """Get the (key or index, value) of data possibly matching a query node:
+    dictionary (or any mapping) values, list (or any sequence & iterator) items
+
+    @returns: tuple (True if data is a mapping, iterable of (key or index, value))
+    """
+    if isinstance(data, (dict, Mapping)):
+        if node.any is not None:
+            return True, data.items()
+        return True, [(key, data[key]) for key in node.keys if key in data]
+    if isinstance(data, (list, Sequence, Iterator)) and not isinstance(data, (str, bytes)):
+        if node.any is not None or isinstance(data, Iterator):
+            return False, enumerate(data)
+        return False, [(index, data[index]) for index in node.indexes if index < len(data)]
+    return False, ()
+
+
+def _iter_query(data, node, path):
+    """Iterate over the (path, value) of data matching a query node - see iter_select()
+    """
+    for key, value in _query_items(data, node)[1]:
+        sub_node = node.keys.get(key, node.any)
+        if sub_node is None:
+            continue
+        if sub_node.end:
+            yield path + (key,), value
+        else:
+            yield from _iter_query(value, sub_node, path + (key,))
+
+
+def _project_query(data, node):
+    """Get the part of data matching a query node - see select()
+
+    @returns: dictionary or list - None if nothing matches
+    """
+    is_mapping, items = _query_items(data, node)
+    projection = {}
+    for key, value in items:
+        sub_node = node.keys.get(key, node.any)
+        if sub_node is None:
+            continue
+        if not sub_node.end:
+            value = _project_query(value, sub_node)
+            if value is None:
+                continue
+        projection[key] = value
+    if not projection:
+        return None
+    return projection if is_mapping else list(projection.values())
+
+
+def iter_select(data, *paths):
+    """Iterate over the values matching path queries, in a single traversal of data
+    Works on dictionaries, lists & any mapping, sequence or iterator (e.g. rows of a table being read),
+    iterators being consumed lazily.
+
+    @args:
+        data:       nested dictionaries & lists
+        paths:      path queries, dotted strings of keys compiled once then cached:
+                    - 'suivi.*.owner': '*' matches any key or list item
+                    - 'other[3].tags' or 'other.3.tags': integer key or list index
+                    or lists of keys ('*' being a wildcard)
+                    when a path matches a value, its longer paths are not walked
+    @returns: generator of tuple (path - tuple of keys & indexes, value)
+    """
+    yield from _iter_query(data, _compile_query(paths), ())
+
+
+def select(data, *paths):
+    """Extract the parts of data matching path queries (see iter_select()), in a single traversal of data
+    Structure is kept: dictionaries contain the matching keys only, lists the matching items only (in order)
+
+    @returns: dictionary (or list if data is a list) - empty if nothing matches
+    """
+    projection = _project_query(data, _compile_query(paths))
+    if projection is None:
+        projection = {} if isinstance(data, Mapping) else []
+    return projection
+
+
+
+def _merge_path(path, key):
+    """Build the dotted path of a key for error messages, path being a linked (parent path, key) tuple
+    """
+    keys = [str(key)]
+    while path:
+        path, key = path
+        keys.append(str(key))
+    return '.'.join(reversed(keys))
+
+
+# tags of frozen containers, so that frozen values are only equal if the values are
+_FROZEN_DICT, _FROZEN_LIST, _FROZEN_TUPLE = object(), object(), object()
+
+
+def _freeze(item):
+    """Get a hashable value equal for equal items: dictionaries, lists, tuples & sets being converted
+    recursively to tagged tuples & frozensets
+    raises TypeError if item contains other unhashable values
+    """
+    if isinstance(item, dict):
+        return _FROZEN_DICT, frozenset((key, _freeze(value)) for key, value in item.items())
+    if isinstance(item, list):
+        return _FROZEN_LIST, tuple(_freeze(value) for value in item)
+    if isinstance(item, (set, frozenset)):
+        return frozenset(item)
+    try:
+        hash(item)
+    except TypeError:
+        if not isinstance(item, tuple):
+            raise
+        return _FROZEN_TUPLE, tuple(_freeze(value) for value in item)
+    return item
+
+
+class _ItemSet():
+    """Set of list items, unhashable items (e.g. dictionaries) being hashed frozen (see _freeze()),
+    or compared by equality if they cannot be frozen
+    """
+    def __init__(self):
+        self._hashables = set()
+        self._frozen = set()
+        self._unhashables = []
+
+    def __len__(self):
+        return len(self._hashables) + len(self._frozen) + len(self._unhashables)
+
+    def __contains__(self, item):
+        try:
+            return item in self._hashables
+        except TypeError:
+            pass
+        try:
+            return _freeze(item) in self._frozen
+        except TypeError:
+            return item in self._unhashables
+
+    def update(self, items):
+        """Add items, duplicates being ignored
+        """
+        for item in items:
+            try:
+                self._hashables.add(item)
+            except TypeError:
+                try:
+                    self._frozen.add(_freeze(item))
+                except TypeError:
+                    if item not in self._unhashables:
+                        self._unhashables.append(item)
+
+
+def append_lists(list_a, list_b):
+    """List conflict strategy: append list_b elements to list_a ones
+    """
+    return list_a + list_b
+
+
+def unique_lists(list_a, list_b):
+    """List conflict strategy: append UNIQUE list_a & list_b elements, keeping their order
+    raises ValueError if list_a or list_b contains duplicated values
+    """
+    try:
+        items_a, items_b = set(list_a), set(list_b)
+    except TypeError:
+        # unhashable elements (e.g. dictionaries): compared by equality
+        items_a, items_b = _ItemSet(), _ItemSet()
+        items_a.update(list_a)
+        items_b.update(list_b)
+    if len(items_a) != len(list_a):
+        raise ValueError('dict_a list contains duplicate')
+    if len(items_b) != len(list_b):
+        raise ValueError('dict_b list contains duplicate')
+    return list_a + [item for item in list_b if item not in items_a]
+
+
+LIST_CONFLICTS = {'a': append_lists, 'u': unique_lists}
+
+
+def _merge_strategies(list_conflict = None, strategies = None):
+    """Get the list of (type, conflict strategy) to apply to values of same key
+    """
+    if list_conflict is not None and list_conflict not in LIST_CONFLICTS:
+        raise vbrExceptions.OtherException("list_conflict parameter unknown (None, 'a' or 'u'): "
+                                           + str(list_conflict))
+    merged = {list: LIST_CONFLICTS[list_conflict]} if list_conflict is not None else {}
+    merged.update(strategies or {})
+    return list(merged.items())
+
+
+def _merge_value(value_a, value_b, path, key, strategies, overwrite_conflict):
+    """Merge 2 non dictionary values of same key - see merge_dict()
+    """
+    if value_a == value_b:
+        return value_a
+    for value_type, strategy in strategies:
+        if isinstance(value_a, value_type) and isinstance(value_b, value_type):
+            try:
+                return strategy(value_a, value_b)
+            except ValueError as exc:
+                raise vbrExceptions.OtherException(str(exc), 'at', _merge_path(path, key), ':',
+                                                   value_a, value_b) from exc
+    if overwrite_conflict:
+        return value_b
+    raise vbrExceptions.OtherException('Conflict at', _merge_path(path, key))
+
+
+def _merge_frame(node, sources, path):
+    """Create a stack frame of _merge_nodes(): (node, iterator over (key, value or values), path, multi-way)
+    """
+    if len(sources) == 1:
+        return node, iter(sources[0].items()), path, False
+    # values of each key, in source order
+    grouped = {}
+    for source in sources:
+        for key, value in source.items():
+            grouped.setdefault(key, []).append(value)
+    return node, iter(grouped.items()), path, True
+
+
+def _merge_nodes(target, sources, path, strategies, overwrite_conflict, copy_on_write = False):
+    """Merge source dictionaries into target dictionary, in one traversal
+    An explicit depth first stack is used instead of recursion: one frame per nesting level.
+    path is a linked tuple (parent path, key), only joined for error messages.
+    If copy_on_write, dictionaries receiving content are copied (target included): inputs are not modified,
+    untouched sub dictionaries being shared.
+    @returns: merged target
+    """
+    if copy_on_write:
+        target = dict(target)
+    stack = [_merge_frame(target, sources, path)]
+    while stack:
+        node, items, path, multi = stack[-1]
+        for key, value in items:
+            if not multi:
+                if key not in node:
+                    node[key] = value
+                elif isinstance(value, dict) and isinstance(node[key], dict):
+                    child = node[key] = dict(node[key]) if copy_on_write else node[key]
+                    stack.append(_merge_frame(child, [value], (path, key)))
+                    break
+                else:
+                    node[key] = _merge_value(node[key], value, path, key, strategies, overwrite_conflict)
+                continue
+
+            current = node[key] if key in node else value.pop(0)
+            children = []
+            for child in value:
+                if isinstance(current, dict) and isinstance(child, dict):
+                    children.append(child)
+                    continue
+                if children:
+                    # current dictionary is compared to a value: it must be complete
+                    current = _merge_nodes(current, children, (path, key), strategies, overwrite_conflict,
+                                           copy_on_write)
+                    children = []
+                current = _merge_value(current, child, path, key, strategies, overwrite_conflict)
+            if children and copy_on_write:
+                current = dict(current)
+            node[key] = current
+            if children:
+                stack.append(_merge_frame(current, children, (path, key)))
+                break
+        else:
+            stack.pop()
+    return target
+
+
+class ReadOnlyDict(Mapping):
+    """Read only view of a nested dictionary, e.g. a merge_dict() result sharing sub dictionaries
+    with merged dictionaries: nested dictionaries are returned as ReadOnlyDict, lists as tuples
+    Compares equal to the dictionary it is a view of (or to any view or mapping equal to it).
+    """
+    __slots__ = ('_dict',)
+
+    def __init__(self, dic):
+        self._dict = dic
+
+    def __getitem__(self, key):
+        value = self._dict[key]
+        if isinstance(value, dict):
+            return ReadOnlyDict(value)
+        if isinstance(value, list):
+            return tuple(value)
+        return value
+
+    def __iter__(self):
+        return iter(self._dict)
+
+    def __len__(self):
+        return len(self._dict)
+
+    def __eq__(self, other):
+        # compared as the viewed dictionary, lists not being seen as tuples
+        if isinstance(other, ReadOnlyDict):
+            other = other._dict
+        elif isinstance(other, Mapping) and not isinstance(other, dict):
+            other = dict(other.items())
+        elif not isinstance(other, dict):
+            return NotImplemented
+        return self._dict == other
+
+    def __repr__(self):
+        return f'ReadOnlyDict({self._dict!r})'
+
+
+def _read_only_source(dic):
+    """Get the dictionary under a ReadOnlyDict, to be merged by copy
+    """
+    return dic._dict if isinstance(dic, ReadOnlyDict) else dic   #pylint: disable=protected-access
+
+
+def _as_read_only(dic):
+    """Wrap a dictionary in a ReadOnlyDict, if not already done
+    """
+    return dic if dic is None or isinstance(dic, ReadOnlyDict) else ReadOnlyDict(dic)
+
+
+def merge_many(dicts, list_conflict:str=None, overwrite_conflict:bool=False, strategies=None,
+               copy_on_write:bool=False, read_only:bool=False):
+    """merges several dictionaries into the first one, in a single traversal
+    Same result as merging them one by one with merge_dict(), without walking merged content again
+    for each dictionary.
+
+    @args:
+        dicts:              iterable of dictionaries - first one receives the content of the others
+        list_conflict, overwrite_conflict, strategies, copy_on_write, read_only:
+                            see merge_dict()
+    @returns: merged dictionary
+    """
+    dicts = [dic for dic in dicts if dic is not None]
+    if dicts and isinstance(dicts[0], FlatDict):
+        merged = dicts[0].copy() if copy_on_write else dicts[0]
+        for dic in dicts[1:]:
+            merged.merge(dic, list_conflict, overwrite_conflict, strategies)
+        return _as_read_only(merged) if read_only else merged
+    dicts = [dic.to_nested() if isinstance(dic, FlatDict) else dic for dic in dicts]
+    strategies = _merge_strategies(list_conflict, strategies)
+    if not dicts:
+        merged = {}
+    elif len(dicts) == 1:
+        merged = dicts[0]
+    else:
+        # a read only dictionary can only be merged by copy
+        copy_on_write = copy_on_write or isinstance(dicts[0], ReadOnlyDict)
+        merged = _merge_nodes(_read_only_source(dicts[0]), [_read_only_source(dic) for dic in dicts[1:]],
+                              None, strategies, overwrite_conflict, copy_on_write)
+    return _as_read_only(merged) if read_only else merged
+
+
+def merge_dict(dict_a, dict_b, path=None, list_conflict:str=None, overwrite_conflict:bool=False,
+               strategies=None, copy_on_write:bool=False, read_only:bool=False):
+    """merges 2 dictionaries, dict_b into dict_a
+    Walk all dictionary keys (iteratively, whatever the depth).
+    When dict_a & dict_b have same key, behavior depends on strategies, list_conflict & overwrite_conflict
+
+    @args:
+        dict_a:             original dictionary into which new content is added
+                            if a FlatDict, merged with FlatDict.merge()
+        dict_b:             dictionary (or FlatDict) to merge into dict_a
+        path:               path captured for error raising
+
+        list_conflict:      when dict_a & dict_b have same key that are list...
+                            - if None, applies overwrite_conflict
+                            - if 'a', appends dict_a & dict_b list elements
+                            - if 'u', appends UNIQUE dict_a & dict_b list elements, keeping their order
+                              raises an exception if dict_a or dict_b contains duplicated values
+
+        overwrite_conflict: when dict_a & dict_b have same key that are not a dictionary
+                            (and have no conflict strategy) ...
+                            - if true, overwrites dict_a value with dict_b
+                            - if false, raises an exception
+
+        strategies:         {type: function(value_a, value_b) returning merged value}
+                            conflict strategy for values of same key that are both of a given type
+                            (e.g. {list: unique_lists, int: max}), overrides list_conflict
+                            function raises ValueError to report a conflict
+
+        copy_on_write:      if true, dict_a & dict_b are not modified: a new dictionary is returned,
+                            sharing all sub dictionaries & values that are not changed by the merge
+                            (only dictionaries along merged keys are copied - cost depends on dict_b size).
+                            Always applies when dict_a is a ReadOnlyDict
+        read_only:          if true, returns merged dictionary as a ReadOnlyDict
+                            (safe way to share it with the merged dictionaries)
+    """
+    if isinstance(dict_a, FlatDict) and dict_b is not None:
+        merged = (dict_a.copy() if copy_on_write else dict_a).merge(dict_b, list_conflict, overwrite_conflict,
+                                                                    strategies)
+        return _as_read_only(merged) if read_only else merged
+    if isinstance(dict_b, FlatDict):
+        dict_b = dict_b.to_nested()
+    strategies = _merge_strategies(list_conflict, strategies)
+    if dict_a is None or dict_b is None:
+        merged = dict_b if dict_a is None else dict_a
+    else:
+        linked_path = None
+        for key in path or []:
+            linked_path = (linked_path, key)
+        merged = _merge_nodes(_read_only_source(dict_a), [_read_only_source(dict_b)], linked_path, strategies,
+                              overwrite_conflict, copy_on_write or isinstance(dict_a, ReadOnlyDict))
+    return _as_read_only(merged) if read_only else merged
+
+
+def _diff_frame(patch, path, dict_a, dict_b):
+    """Create a stack frame of diff_dict(): (path, dict_a, keys of dict_a, iterator over dict_b items)
+    Keys of dict_a missing in dict_b are reported as removed when the frame is created.
+    """
+    patch.extend(['remove', [*path, key]] for key in dict_a if key not in dict_b)
+    return path, dict_a, dict_a, iter(dict_b.items())
+
+
+def _list_diff_frame(patch, path, list_a, list_b, strategy):
+    """Create a stack frame of diff_dict() comparing lists item by item, keys being the indexes:
+    (path, list_a, indexes of list_a, iterator over the items of list_b also in list_a)
+    Items removed from the end of list_a or added at the end of list_b are reported when the frame is created:
+    added ones as an 'extend', unless the list conflict strategy would not just append them.
+    """
+    common = min(len(list_a), len(list_b))
+    patch.extend(['remove', [*path, index]] for index in range(len(list_a) - 1, common - 1, -1))
+    tail = list_b[common:]
+    if tail:
+        try:
+            appended = strategy is None or strategy(list_a, tail) == list_a + tail
+        except ValueError:
+            appended = False
+        if appended:
+            patch.append(['extend', [*path], tail])
+        else:
+            patch.extend(['add', [*path, index], item] for index, item in enumerate(tail, common))
+    return path, list_a, range(common), zip(range(common), list_b)
+
+
+def diff_dict(dict_a, dict_b, list_conflict:str=None):
+    """Get the patch transforming dict_a into dict_b (see apply_patch())
+    Identical sub dictionaries (same object or equal) are skipped without being walked.
+
+    @args:
+        dict_a:             original dictionary
+        dict_b:             new dictionary
+        list_conflict:      list conflict strategy ('a' or 'u', see merge_dict()) of 'extend' operations:
+                            elements added at the end of a list are reported as an 'extend' if merging them
+                            with this strategy just appends them (always if not set)
+
+    Lists are compared item by item, items being identified by their index in paths.
+
+    @returns: patch - list of json serializable operations [op, path (list of keys), value]:
+              - ['add', path, value]:       key added, or item added at the end of a list
+              - ['remove', path]:           key removed, or item removed from the end of a list
+              - ['change', path, value]:    value changed
+              - ['extend', path, elements]: elements merged into a list with list_conflict strategy
+              values are shared with dict_b
+    """
+    strategy = dict(_merge_strategies(list_conflict)).get(list)
+    patch = []
+    stack = [_diff_frame(patch, (), dict_a, dict_b)]
+    while stack:
+        path, node_a, keys_a, items = stack[-1]
+        for key, value_b in items:
+            if key not in keys_a:
+                patch.append(['add', [*path, key], value_b])
+                continue
+            value_a = node_a[key]
+            if value_a is value_b or value_a == value_b:
+                continue
+            if isinstance(value_a, dict) and isinstance(value_b, dict):
+                stack.append(_diff_frame(patch, path + (key,), value_a, value_b))
+                break
+            if isinstance(value_a, list) and isinstance(value_b, list):
+                stack.append(_list_diff_frame(patch, path + (key,), value_a, value_b, strategy))
+                break
+            patch.append(['change', [*path, key], value_b])
+        else:
+            stack.pop()
+    return patch
+
+
+def _list_index(items, key):
+    """Get the index of a list item identified by a path key (index, possibly as a string as saved in json)
+    - None if not an index of the list
+    """
+    try:
+        index = int(key)
+    except (TypeError, ValueError):
+        return None
+    return index if 0 <= index < len(items) else None
+
+
+def apply_patch(dic, patch, list_conflict:str=None, copy_on_write:bool=False, read_only:bool=False):
+    """Apply a patch (see diff_dict()) to a dictionary
+
+    @args:
+        dic:                dictionary to patch
+        patch:              list of operations, as returned by diff_dict()
+        list_conflict:      strategy of 'extend' operations ('a' or 'u', see merge_dict()),
+                            same as the one given to diff_dict() - if not set, elements are appended
+        copy_on_write:      if true, dic is not modified: a new dictionary is returned,
+                            only the dictionaries along patched paths being copied (see merge_dict())
+                            Always applies when dic is a ReadOnlyDict
+        read_only:          if true, returns patched dictionary as a ReadOnlyDict
+    @returns: patched dictionary
+    """
+    strategy = dict(_merge_strategies(list_conflict)).get(list)
+    copy_on_write = copy_on_write or isinstance(dic, ReadOnlyDict)
+    root = _read_only_source(dic)
+    if copy_on_write:
+        root = dict(root)
+    # dictionaries already copied, not to be copied again
+    copies = {id(root)}
+
+    for op, path, *value in patch:
+        node = root
+        for key in path[:-1]:
+            if isinstance(node, list):
+                key = _list_index(node, key)
+                child = None if key is None else node[key]
+            else:
+                child = node.get(key)
+            if not isinstance(child, (dict, list)):
+                raise vbrExceptions.OtherException('Patch does not apply, missing dictionary or list at',
+                                                   '.'.join(str(key) for key in path))
+            if copy_on_write and id(child) not in copies:
+                child = node[key] = type(child)(child)
+                copies.add(id(child))
+            node = child
+
+        key = path[-1]
+        if isinstance(node, list):
+            # item added at the end of the list, other operations on existing items
+            index = _list_index(node, key)
+            if (op == 'add') != (index is None and str(key) == str(len(node))):
+                raise vbrExceptions.OtherException('Patch does not apply,', op, 'at',
+                                                   '.'.join(str(key) for key in path))
+            if op == 'add':
+                node.append(value[0])
+                continue
+            key = index
+        elif (op == 'add') == (key in node):
+            raise vbrExceptions.OtherException('Patch does not apply,', op, 'at',
+                                               '.'.join(str(key) for key in path))
+        if op == 'remove':
+            del node[key]
+        elif op == 'extend':
+            if not isinstance(node[key], list):
+                raise vbrExceptions.OtherException('Patch does not apply, cannot extend at',
+                                                   '.'.join(str(key) for key in path))
+            try:
+                node[key] = node[key] + value[0] if strategy is None else strategy(node[key], value[0])
+            except ValueError as exc:
+                raise vbrExceptions.OtherException(str(exc), 'at', '.'.join(str(key) for key in path)) from exc
+        elif op in ('add', 'change'):
+            node[key] = value[0]
+        else:
+            raise vbrExceptions.OtherException('Unknown patch operation:', op)
+    return _as_read_only(root) if read_only else root
+
+
+def create_nested_dict(keys, last_key_val):
+    ''' Creates a dic from a list of key by nesting them
+
+    @args:
+        keys:           list of keys to nest
+        last_key_val:   value of the last key
+    '''
+    value = last_key_val
+    for key in reversed(keys):
+        value = {key:  value}
+    return value
+
+
+def _iter_leaves(dict_a, keys = ()):
+    ''' Iterate over the (key path, value) of all non dictionary values of a nested dictionary
+        Empty dictionaries are considered as values
+    '''
+    for key, value in dict_a.items():
+        if isinstance(value, dict) and value:
+            yield from _iter_leaves(value, keys + (key,))
+        else:
+            yield keys + (key,), value
+
+
+def columns_from_rows(rows):
+    ''' Transform a list of (nested) dictionaries into a columnar dictionary
+        {key: {sub_key: [value of each row]}}, keeping the nested structure at column level.
+        Rows missing a key get a None value in the column.
+        see rows_from_columns() for the reverse operation
+
+    @args:
+        rows:   iterable of dictionaries
+    '''
+    flat_columns = {}
+    nb_rows = 0
+    for nb_rows, row in enumerate(rows, 1):
+        for keys, value in _iter_leaves(row):
+            column = flat_columns.setdefault(keys, [])
+            column.extend([None] * (nb_rows - 1 - len(column)))
+            column.append(value)
+
+    columns = {}
+    for keys, column in flat_columns.items():
+        column.extend([None] * (nb_rows - len(column)))
+        node = columns
+        for depth, key in enumerate(keys[:-1]):
+            node = node.setdefault(key, {})
+            if not isinstance(node, dict):
+                raise vbrExceptions.OtherException('Conflict at', '.'.join(str(k) for k in keys[:depth + 1]))
+        if keys[-1] in node:
+            raise vbrExceptions.OtherException('Conflict at', '.'.join(str(k) for k in keys))
+        node[keys[-1]] = column
+    return columns
+
+
+def rows_from_columns(columns):
+    ''' Rebuild, one at a time, the rows of a columnar dictionary created by columns_from_rows()
+        None values are skipped
+
+    @returns: generator of dictionaries
+
+    @args:
+        columns:    columnar dictionary
+    '''
+    flat_columns = list(_iter_leaves(columns))
+    nb_rows = max((len(column) for _, column in flat_columns), default = 0)
+    for i in range(nb_rows):
+        row = {}
+        for keys, column in flat_columns:
+            value = column[i]
+            if value is None:
+                continue
+            node = row
+            for key in keys[:-1]:
+                node = node.setdefault(key, {})
+            node[keys[-1]] = value
+        yield row
+
+
+def _flatten(dic, prefix, values):
+    """Add the (dotted key path, value) of the non dictionary values (and empty dictionaries)
+    of a nested dictionary to values, key paths starting with prefix
+    """
+    for key, value in dic.items():
+        if isinstance(value, dict) and value:
+            _flatten(value, f'{prefix}{key}.', values)
+        else:
+            values[f'{prefix}{key}'] = value
+
+
+class FlatDict(MutableMapping):
+    """Flat form of a nested dictionary: {dotted key path: value}, as exceltojson column names
+    e.g. {'a': {'b': 1, 'c': [2]}} <-> {'a.b': 1, 'a.c': [2]}
+    Values are the non dictionary values of the nested dictionary (and its empty dictionaries).
+    Get & set are direct dictionary accesses, keys under a prefix are found with a sorted key index.
+    Setting a key path does not check it against others (e.g. 'a.b' & 'a.b.c'): conflicts are raised
+    when merging (merge()) or converting (to_nested()).
+    """
+    def __init__(self, items = None):
+        """Create the flat dictionary
+
+        @args:
+            items:      {dotted key path: value} or iterable of (dotted key path, value)
+                        see from_nested() to create it from a nested dictionary
+        """
+        self._values = dict(items or {})
+        # sorted keys, updated on prefix search: keys added since are pending
+        self._index = []
+        self._pending = list(self._values)
+
+    @classmethod
+    def from_nested(cls, dic):
+        """Create a flat dictionary from a nested dictionary
+        """
+        flat = cls()
+        _flatten(dic, '', flat._values)
+        flat._pending = list(flat._values)
+        return flat
+
+    def to_nested(self, key_as_int = True):
+        """Get the nested dictionary
+
+        @args:
+            key_as_int:     key conversion policy of key path components - see jsonstore.load_json_file()
+        """
+        convert_key = _key_converter(key_as_int)
+        nested = {}
+        # parent dictionary of each key path prefix
+        parents = {'': nested}
+
+        def parent_of(prefix):
+            parent = parents.get(prefix)
+            if parent is None:
+                grand_prefix, _, name = prefix.rpartition('.')
+                parent = parent_of(grand_prefix).setdefault(convert_key(name), {})
+                if not isinstance(parent, dict):
+                    raise vbrExceptions.OtherException('Conflict at', prefix)
+                parents[prefix] = parent
+            return parent
+
+        # keys of a same dictionary usually follow each other
+        last_prefix, parent = '', nested
+        for key, value in self._values.items():
+            prefix, _, name = key.rpartition('.')
+            if prefix != last_prefix:
+                parent = parent_of(prefix)
+                last_prefix = prefix
+            name = convert_key(name)
+            if name in parent:
+                raise vbrExceptions.OtherException('Conflict at', key)
+            parent[name] = value
+        return nested
+
+    @classmethod
+    def _from_state(cls, values, index, pending):
+        """Create a flat dictionary from its values, sorted key index & keys pending indexing
+        """
+        flat = cls()
+        flat._values, flat._index, flat._pending = values, index, pending
+        return flat
+
+    def copy(self):
+        """Get a copy of the flat dictionary (values are shared), its key index included
+        """
+        return self._from_state(dict(self._values), list(self._index), list(self._pending))
+
+    def __getitem__(self, key):
+        return self._values[key]
+
+    def __setitem__(self, key, value):
+        if key not in self._values:
+            self._pending.append(key)
+        self._values[key] = value
+
+    def __delitem__(self, key):
+        del self._values[key]
+        index = bisect_left(self._index, key)
+        if index < len(self._index) and self._index[index] == key:
+            del self._index[index]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return f'FlatDict({self._values!r})'
+
+    def _sorted_keys(self):
+        """Get the sorted key index, adding pending keys
+        """
+        pending = [key for key in self._pending if key in self._values]
+        if len(pending) > len(self._index) // 8:
+            self._index = sorted(self._values)
+        else:
+            for key in pending:
+                index = bisect_left(self._index, key)
+                if index == len(self._index) or self._index[index] != key:
+                    self._index.insert(index, key)
+        self._pending = []
+        return self._index
+
+    def iter_prefix(self, prefix):
+        """Iterate over the (key, value) of the key path prefix and of the key paths under it, sorted by key
+        e.g. 'a.b' gets 'a.b', 'a.b.c', 'a.b.d.e' but not 'a.bc'
+        """
+        if prefix in self._values:
+            yield prefix, self._values[prefix]
+        keys = self._sorted_keys()
+        # keys under prefix are the ones between 'prefix.' & 'prefix/' ('/' following '.')
+        for key in keys[bisect_left(keys, prefix + '.'):bisect_left(keys, prefix + '/')]:
+            yield key, self._values[key]
+
+    def sub(self, prefix):
+        """Get the flat dictionary under a key path prefix, with key paths relative to prefix
+        """
+        start = len(prefix) + 1
+        return FlatDict((key[start:], value) for key, value in self.iter_prefix(prefix) if key != prefix)
+
+    def merge(self, other, list_conflict:str=None, overwrite_conflict:bool=False, strategies=None):
+        """Merge a flat or nested dictionary into this one, as merge_dict() does with nested dictionaries
+
+        @args:
+            other:          FlatDict or nested dictionary
+            list_conflict, overwrite_conflict, strategies:
+                            see merge_dict()
+        @returns: self
+        """
+        strategies = _merge_strategies(list_conflict, strategies)
+        if not isinstance(other, FlatDict):
+            other = FlatDict.from_nested(other)
+        # keys added by the merge are not indexed until merge is done: they are the keys of other
+        keys = self._sorted_keys()
+        for key, value in other.items():
+            if key in self._values:
+                self._values[key] = _merge_value(self._values[key], value, None, key, strategies,
+                                                 overwrite_conflict)
+                continue
+            # a value replaced by a dictionary, or a dictionary by a value: nested key path conflict
+            parent = key.rpartition('.')[0]
+            while parent and parent not in self._values:
+                parent = parent.rpartition('.')[0]
+            start = bisect_left(keys, key + '.')
+            children = keys[start:bisect_left(keys, key + '/', start)]
+            if parent and self._values[parent] == {}:
+                del self[parent]
+            elif children and value == {}:
+                continue
+            elif parent or children:
+                if not overwrite_conflict:
+                    raise vbrExceptions.OtherException('Conflict at', parent or key)
+                for child in [parent] if parent else children:
+                    del self[child]
+            self[key] = value
+        return self
+
+
+def _int_key(key):
+    """Convert a key made of decimal digits to integer
+    """
+    return int(key) if isinstance(key, str) and key.isdecimal() else key
+
+
+def dict_keys_to_int(dict_a):
+    """transform all relevant dictionary keys from string to integer
+    Recurse all keys, including dictionaries in lists. Key order is kept.
+
+    @args:
+        dict_a: original list into which new content is added
+    """
+    items = [(_int_key(key), value) for key, value in dict_a.items()]
+    dict_a.clear()
+    for key, value in items:
+        dict_a[key] = value
+        if isinstance(value, dict):
+            dict_keys_to_int(value)
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict):
+                    dict_keys_to_int(item)
+    return dict_a
+
+
+def _int_keys_hook(json_object):
+    """json object hook transforming keys made of decimal digits to integer
+    """
+    for key in json_object:
+        if key.isdecimal():
+            return {_int_key(key): value for key, value in json_object.items()}
+    return json_object
+
+
+def _keys_hook(key_as_int):
+    """Get the json object hook applying a key conversion policy - see jsonstore.load_json_file()
+    """
+    if callable(key_as_int):
+        return lambda json_object: {key_as_int(key): value for key, value in json_object.items()}
+    return _int_keys_hook if key_as_int else None
+
+
+def _key_converter(key_as_int):
+    """Get the function converting a json key with a key conversion policy - see jsonstore.load_json_file()
+    """
+    return key_as_int if callable(key_as_int) else _int_key if key_as_int else lambda key: key
+
+if __name__ == '__main__':
+    raise vbrExceptions.OtherException('This module should not be called directly.')
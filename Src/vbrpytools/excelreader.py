@@ -0,0 +1,905 @@
+''' Read excel workbook tables, row by row, as json-ready data
+
+Low level reading layer of exceltojson: table index read from the workbook xml parts, rows streamed
+straight from the sheet xml, cell conversion along the column schema, and compact table storage.
+'''
+
+import hashlib
+import io
+import operator
+import re
+from collections import namedtuple
+from collections.abc import Mapping, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time
+from fnmatch import fnmatchcase
+from functools import partial
+from math import ceil
+from zipfile import ZipFile
+
+from openpyxl import load_workbook
+from openpyxl.packaging.relationship import get_dependents, get_rels_path
+from openpyxl.packaging.workbook import WorkbookPackage
+from openpyxl.utils.cell import range_boundaries
+from openpyxl.worksheet._reader import WorkSheetParser
+from openpyxl.worksheet.table import Table
+from openpyxl.xml.constants import ARC_ROOT_RELS, REL_NS
+from openpyxl.xml.functions import fromstring
+
+from vbrpytools import exceptions as vbrExceptions
+from vbrpytools.dicjsontools import columns_from_rows
+
+
+TableInfo = namedtuple('TableInfo', ['name', 'sheet', 'ref', 'column_names', 'table',
+                                     'sheet_part', 'table_part', 'workbook_parts'])
+TableInfo.__doc__ = ''' Table definition, as read from the excel file archive
+    name:           table name
+    sheet:          title of the worksheet containing the table
+    ref:            table range, header included (e.g. 'A1:K1865')
+    column_names:   table header
+    table:          openpyxl table object
+    sheet_part:     path of the worksheet xml in the archive
+    table_part:     path of the table xml in the archive
+    workbook_parts: paths of the workbook wide parts table values also depend on
+                    (workbook, shared strings, styles)
+'''
+
+def read_table_index(filename):
+    ''' Read the tables of an excel file straight from its archive, without loading any worksheet:
+        only the workbook, worksheet relationships & table parts are read.
+    Args:
+        filename (str): excel file
+    Returns:
+        dict: {table name: TableInfo}
+    '''
+    table_index = {}
+    with ZipFile(filename) as archive:
+        wb_part = next(rel.target for rel in get_dependents(archive, ARC_ROOT_RELS)
+                       if rel.Type.endswith('/officeDocument'))
+        wb_rels = get_dependents(archive, get_rels_path(wb_part))
+        package = WorkbookPackage.from_tree(fromstring(archive.read(wb_part)))
+        valid_files = set(archive.namelist())
+        wb_parts = (wb_part,) + tuple(rel.target for rel in wb_rels
+                                      if rel.Type.endswith(('/sharedStrings', '/styles')))
+
+        for sheet in package.sheets:
+            ws_part = wb_rels.get(sheet.id).target
+            ws_rels_part = get_rels_path(ws_part)
+            if ws_rels_part not in valid_files:
+                continue
+            for rel in get_dependents(archive, ws_rels_part).find(f'{REL_NS}/table'):
+                table = Table.from_tree(fromstring(archive.read(rel.target)))
+                table_index[table.name] = TableInfo(table.name, sheet.name, table.ref, table.column_names,
+                                                    table, ws_part, rel.target, wb_parts)
+    return table_index
+
+
+class _ChainedStream(io.RawIOBase):
+    ''' Read only binary stream chaining several bytes & binary streams
+    '''
+    def __init__(self, *parts):
+        super().__init__()
+        self._parts = [io.BytesIO(part) if isinstance(part, bytes) else part for part in parts]
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while self._parts:
+            data = self._parts[0].read(len(buffer))
+            if data:
+                buffer[:len(data)] = data
+                return len(data)
+            self._parts.pop(0)
+        return 0
+
+
+_ROW_TAG = re.compile(rb'<(?:\w+:)?row[\s>/]')
+_ROW_NUMBER = re.compile(rb'\sr="(\d+)"')
+
+def _seek_sheet_row(src, min_row, chunk_size = 1 << 20):
+    ''' Skip the rows of a worksheet xml stream located before min_row, without parsing them.
+        Parsing the skipped rows (as openpyxl does) would make reading the end of a large table
+        as slow as reading the whole table.
+    Args:
+        src (binary stream): worksheet xml
+        min_row (int): first row to keep
+    Returns:
+        binary stream: worksheet xml header followed by rows starting at min_row,
+                       None if no row is found at or after min_row
+    Raises:
+        ValueError: rows are not numbered, so they cannot be skipped without parsing them
+    '''
+    header = None
+    buffer = b''
+    pos = 0
+    while True:
+        match = _ROW_TAG.search(buffer, pos)
+        tag_end = -1 if match is None else buffer.find(b'>', match.start())
+        if tag_end < 0:
+            # no complete row tag in buffer > read more, only keeping what may be needed
+            chunk = src.read(chunk_size)
+            if not chunk:
+                return None
+            if header is not None:
+                buffer = buffer[match.start() if match else max(pos, len(buffer) - 8):]
+                pos = 0
+            buffer += chunk
+            continue
+
+        if header is None:
+            header = buffer[:match.start()]
+        row_number = _ROW_NUMBER.search(buffer, match.start(), tag_end)
+        if row_number is None:
+            raise ValueError('worksheet rows are not numbered')
+        if int(row_number.group(1)) >= min_row:
+            return _ChainedStream(header, buffer[match.start():], src)
+        pos = tag_end
+
+
+def _iter_sheet_rows(ws, min_row, max_row, min_col, max_col):
+    ''' Iterate over the values of a read only worksheet rows, same as ws.iter_rows(values_only = True),
+        but rows located before min_row are skipped without being parsed.
+    '''
+    empty_row = (None,) * (max_col + 1 - min_col)
+    src = ws._get_source()                                      #pylint: disable=protected-access
+    try:
+        rows_src = _seek_sheet_row(src, min_row)
+    except ValueError:
+        src.close()
+        yield from ws.iter_rows(min_row = min_row, max_row = max_row,
+                                min_col = min_col, max_col = max_col,
+                                values_only = True)
+        return
+
+    with src:
+        next_row = min_row
+        if rows_src is not None:
+            parser = WorkSheetParser(rows_src,
+                                     ws._shared_strings,                        #pylint: disable=protected-access
+                                     data_only = True,
+                                     epoch = ws.parent.epoch,
+                                     date_formats = ws.parent._date_formats,   #pylint: disable=protected-access
+                                     timedelta_formats = ws.parent._timedelta_formats)   #pylint: disable=protected-access
+            for row_idx, cells in parser.parse():
+                if row_idx > max_row:
+                    break
+                # some rows are missing
+                for _ in range(next_row, row_idx):
+                    yield empty_row
+                yield ws._get_row(cells, min_col, max_col, values_only = True)   #pylint: disable=protected-access
+                next_row = row_idx + 1
+        for _ in range(next_row, max_row + 1):
+            yield empty_row
+
+
+def _split_multivalue(cell_value):
+    ''' Split a semicolon ";" separated multi-value cell
+    '''
+    if str(cell_value).isnumeric():
+        return [cell_value]
+    return str(cell_value).split(';')
+
+
+def _to_int(cell_value):
+    ''' Convert a cell into an integer, refusing to truncate decimal numbers
+    '''
+    int_value = int(cell_value)
+    if isinstance(cell_value, float) and int_value != cell_value:
+        raise ValueError('decimal number', cell_value)
+    return int_value
+
+
+def _to_date(cell_value):
+    ''' Convert a date or datetime cell into an ISO date string
+    '''
+    if isinstance(cell_value, datetime):
+        cell_value = cell_value.date()
+    return cell_value.isoformat()
+
+
+# column types supported in table schema, with their conversion function
+COLUMN_TYPES = {'raw':      None,
+                'str':      str,
+                'int':      _to_int,
+                'float':    float,
+                'datetime': datetime.isoformat,
+                'date':     _to_date,
+                'time':     time.isoformat,
+                'list':     _split_multivalue,
+               }
+
+def _convert_or_keep(convert, cell_value):
+    ''' Convert a cell of a column with an inferred type, keeping values not matching the type as read
+        (e.g. text in a column only holding numbers in its first rows)
+    '''
+    try:
+        return convert(cell_value)
+    except (TypeError, ValueError):
+        return cell_value
+
+
+class _ResolvedSchema(dict):
+    ''' Type of each column of a table {column name: key of COLUMN_TYPES}, with the names of the columns
+        whose type was inferred: values not matching an inferred type are kept as read, instead of raising
+    '''
+    def __init__(self, column_types, inferred = ()):
+        super().__init__(column_types)
+        self.inferred = frozenset(inferred)
+
+
+def _infer_column_type(column_name, sample_values):
+    ''' Infer the type of a column from a sample of its non empty values
+    Returns:
+        str: key of COLUMN_TYPES
+    '''
+    if column_name[0] == '[' and column_name[-1] == ']':
+        return 'list'
+    value_types = {type(value) for value in sample_values}
+    if value_types == {str}:
+        return 'str'
+    if value_types == {int}:
+        return 'int'
+    if value_types and value_types <= {int, float}:
+        return 'float'
+    for value_type, column_type in ((datetime, 'datetime'), (date, 'date'), (time, 'time')):
+        if value_types == {value_type}:
+            return column_type
+    return 'raw'
+
+
+def _column_key(column_name):
+    ''' Get the (dotted) key of a column, without its multi-value brakets
+    '''
+    if column_name[0] == '[' and column_name[-1] == ']':
+        return column_name[1:-1]
+    return column_name
+
+
+def _is_kept(column_name, with_ignored = False, columns = None):
+    ''' Check if a column is part of the output
+    Args:
+        column_name (str): column name, as in the table header
+        with_ignored (bool): if True, keep columns starting with hash '#'
+        columns (list of str): dotted keys or glob patterns of the columns to keep, a key also
+                               selecting all its sub keys - None to keep all columns
+    '''
+    if column_name[0] == '#' and not with_ignored:
+        return False
+    if columns is None:
+        return True
+    key = _column_key(column_name)
+    return any(fnmatchcase(key, pattern) or key.startswith(pattern + '.') for pattern in columns)
+
+
+class _CellView(Mapping):
+    ''' Read only view of the cell values of a row, by column key
+    '''
+    def __init__(self, column_ids):
+        self._column_ids = column_ids
+        self.row = ()
+
+    def __getitem__(self, key):
+        return self.row[self._column_ids[key]]
+
+    def __iter__(self):
+        return iter(self._column_ids)
+
+    def __len__(self):
+        return len(self._column_ids)
+
+
+class _RowFilter():
+    ''' Compiled row filter, evaluated on the cell values of a row, before its dictionary is created
+    '''
+    _CONDITION = re.compile(r'^\s*(.+?)\s*(==|!=|<=|>=|<|>)\s*(.*?)\s*$')
+    _OPERATORS = {'==': operator.eq, '!=': operator.ne,
+                  '<':  operator.lt, '<=': operator.le,
+                  '>':  operator.gt, '>=': operator.ge}
+
+    def __init__(self, where, column_names):
+        ''' Compile the filter
+        Args:
+            where: callable, taking a mapping {column key: cell value} and returning True to keep the row
+                   or str, conditions "<column key> <operator> <value>" joined with 'and'
+                   (operators: == != < <= > >=, value: number or string, possibly quoted)
+            column_names (list of str): table header
+        '''
+        column_ids = {_column_key(name): col for col, name in enumerate(column_names)}
+
+        if callable(where):
+            self._view = _CellView(column_ids)
+            self._predicate = where
+            self.match = self._match_predicate
+            self.columns = list(range(len(column_names)))
+            return
+
+        self._conditions = []
+        for condition in re.split(r'\s+and\s+', where.strip()):
+            parsed = self._CONDITION.match(condition)
+            if parsed is None:
+                raise vbrExceptions.OtherException('Invalid where condition:', condition)
+            key, op, value = parsed.groups()
+            if key not in column_ids:
+                raise vbrExceptions.OtherException('Unknown column in where condition:', key)
+            self._conditions.append((column_ids[key], self._OPERATORS[op], self._parse_value(value)))
+        self.match = self._match_conditions
+        self.columns = [col for col, _, _ in self._conditions]
+
+    @staticmethod
+    def _parse_value(value):
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in '\'"':
+            return value[1:-1]
+        for cast in (int, float):
+            try:
+                return cast(value)
+            except ValueError:
+                pass
+        return value
+
+    def _match_predicate(self, row):
+        self._view.row = row
+        return self._predicate(self._view)
+
+    def _match_conditions(self, row):
+        try:
+            return all(op(row[col], value) for col, op, value in self._conditions)
+        except TypeError:
+            # values that cannot be compared (e.g. empty cell and number) do not match
+            return False
+
+
+class _RowBuilder():
+    ''' Compiled plan to create row dictionaries from a table header
+        The header is parsed once (ignored columns, key paths, parent dictionaries, conversion
+        function of each column), then each row is filled with direct assignments.
+    '''
+    def __init__(self, column_names, nested = True, with_ignored = False, column_types = None, columns = None,
+                 inferred_columns = ()):
+        ''' Compile the header
+        Args:
+            column_names (list of str): table header
+            nested (bool): if True, create nested dictionary based on column names
+            with_ignored (bool): if True, keep columns starting with hash '#'
+            column_types (dict): {column name: key of COLUMN_TYPES} - None to keep values as read,
+                                 multi-value columns being split
+            columns (list of str): columns to keep - see _is_kept()
+            inferred_columns (set of str): columns whose type was inferred, values not matching it
+                                           being kept as read instead of raising
+        '''
+        column_types = column_types or {}
+        unknown_types = set(column_types.values()) - set(COLUMN_TYPES)
+        if unknown_types:
+            raise vbrExceptions.OtherException('Unknown column type(s):', unknown_types,
+                                               'supported:', list(COLUMN_TYPES))
+
+        # parent dictionaries are identified by their position in the row node list.
+        # node 0 is the row itself, node i > 0 is created as key _parents[i-1][1] of node _parents[i-1][0]
+        self._parents = []
+        parent_ids = {(): 0}
+
+        # one entry per kept column: (column index, parent node id, key, conversion function, key path)
+        self._columns = []
+        for col, name in enumerate(column_names):
+            if not _is_kept(name, with_ignored, columns):
+                continue
+            multivalue = name[0] == '[' and name[-1] == ']'
+            convert = COLUMN_TYPES[column_types.get(name, 'list' if multivalue else 'raw')]
+            if convert is not None and name in inferred_columns:
+                convert = partial(_convert_or_keep, convert)
+            if multivalue:
+                name = name[1:-1]
+            keys = tuple(name.split('.')) if nested else (name,)
+
+            parent_id = 0
+            for depth in range(1, len(keys)):
+                if keys[:depth] not in parent_ids:
+                    self._parents.append((parent_id, keys[depth - 1]))
+                    parent_ids[keys[:depth]] = len(self._parents)
+                parent_id = parent_ids[keys[:depth]]
+            self._columns.append((col, parent_id, keys[-1], convert, keys))
+
+        # row views (see CompactRow): for each node, its children {key: [(is node, node id or value index)]}
+        # and the (value index, child key) of all its descendant values, in column order
+        self.children = [{} for _ in range(len(self._parents) + 1)]
+        self.descendants = [[] for _ in range(len(self._parents) + 1)]
+        for index, (_, _, _, _, keys) in enumerate(self._columns):
+            for depth, key in enumerate(keys):
+                node_id = parent_ids[keys[:depth]]
+                child = (True, parent_ids[keys[:depth + 1]]) if depth < len(keys) - 1 else (False, index)
+                candidates = self.children[node_id].setdefault(key, [])
+                if child not in candidates:
+                    candidates.append(child)
+                self.descendants[node_id].append((index, key))
+        # a key path used twice, or both for a value & a parent: rows may have conflicts to check
+        self.has_conflicts = any(len(candidates) > 1
+                                 for children in self.children for candidates in children.values())
+
+    def _node(self, nodes, node_id, keys):
+        ''' Create (and attach to its own parent) the parent dictionary node_id of a row
+        '''
+        grandparent_id, key = self._parents[node_id - 1]
+        grandparent = nodes[grandparent_id]
+        if grandparent is None:
+            grandparent = self._node(nodes, grandparent_id, keys)
+        if key in grandparent:
+            raise vbrExceptions.OtherException('Conflict at', '.'.join(keys))
+        node = grandparent[key] = nodes[node_id] = {}
+        return node
+
+    def build(self, row):
+        ''' Create the dictionary of a row
+        Args:
+            row (tuple): cell values of the row
+        Returns:
+            dict: empty cells are skipped
+        '''
+        nodes = [{}] + [None] * len(self._parents)
+        for col, parent_id, key, convert, keys in self._columns:
+            cell_value = row[col]
+            if cell_value is None or cell_value == '':
+                continue
+
+            if convert is not None:
+                try:
+                    cell_value = convert(cell_value)
+                except (TypeError, ValueError) as exc:
+                    raise vbrExceptions.OtherException('Cannot convert', repr(cell_value),
+                                                       'at', '.'.join(keys)) from exc
+
+            node = nodes[parent_id]
+            if node is None:
+                node = self._node(nodes, parent_id, keys)
+            if key in node and node[key] != cell_value:
+                raise vbrExceptions.OtherException('Conflict at', '.'.join(keys))
+            node[key] = cell_value
+        return nodes[0]
+
+    def convert(self, row):
+        ''' Get the converted values of a row
+        Args:
+            row (tuple): cell values of the row
+        Returns:
+            list: one value per kept column, None for empty cells
+        '''
+        values = []
+        for col, _, _, convert, keys in self._columns:
+            cell_value = row[col]
+            if cell_value is None or cell_value == '':
+                cell_value = None
+            elif convert is not None:
+                try:
+                    cell_value = convert(cell_value)
+                except (TypeError, ValueError) as exc:
+                    raise vbrExceptions.OtherException('Cannot convert', repr(cell_value),
+                                                       'at', '.'.join(keys)) from exc
+            values.append(cell_value)
+        return values
+
+
+class CompactTable(Sequence):
+    ''' Memory compact table: a shared compiled header & one tuple of values per row.
+        Repeated strings (and multi-value lists, stored as tuples) are stored once.
+        Rows are read through CompactRow views, to_dicts() creating plain dictionaries.
+    '''
+    def __init__(self, row_builder, rows):
+        ''' Store the rows
+        Args:
+            row_builder (_RowBuilder): compiled header
+            rows (iterable of tuple): cell values of each row
+        '''
+        self._row_builder = row_builder
+        interned = {}
+        self._rows = []
+        for row in rows:
+            if row_builder.has_conflicts:
+                # raise the same errors as when creating the row dictionary
+                row_builder.build(row)
+            values = row_builder.convert(row)
+            for index, value in enumerate(values):
+                if isinstance(value, list):
+                    value = tuple(interned.setdefault(v, v) if isinstance(v, str) else v for v in value)
+                if isinstance(value, (str, tuple)):
+                    values[index] = interned.setdefault(value, value)
+            self._rows.append(tuple(values))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [CompactRow(self._row_builder, values) for values in self._rows[index]]
+        return CompactRow(self._row_builder, self._rows[index])
+
+    def __len__(self):
+        return len(self._rows)
+
+    def to_dicts(self):
+        ''' Create the dictionary of each row
+        Returns:
+            list of dictionary: same as dict_from_table()
+        '''
+        return [row.to_dict() for row in self]
+
+
+class CompactRow(Mapping):
+    ''' Read only view of a CompactTable row (or of one of its nested dictionaries)
+        Multi-value items are given as new lists, nested dictionaries as CompactRow.
+    '''
+    __slots__ = ('_row_builder', '_values', '_node_id')
+
+    def __init__(self, row_builder, values, node_id = 0):
+        self._row_builder = row_builder
+        self._values = values
+        self._node_id = node_id
+
+    def __getitem__(self, key):
+        for is_node, index in self._row_builder.children[self._node_id][key]:
+            if is_node:
+                if any(self._values[i] is not None for i, _ in self._row_builder.descendants[index]):
+                    return CompactRow(self._row_builder, self._values, index)
+            elif self._values[index] is not None:
+                value = self._values[index]
+                return list(value) if isinstance(value, tuple) else value
+        raise KeyError(key)
+
+    def __iter__(self):
+        # keys in the order the row dictionary would have them: order of their first non empty value
+        seen = set()
+        for index, key in self._row_builder.descendants[self._node_id]:
+            if self._values[index] is not None and key not in seen:
+                seen.add(key)
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def to_dict(self):
+        ''' Create a plain dictionary from the view
+        '''
+        return {key: value.to_dict() if isinstance(value, CompactRow) else value
+                for key, value in self.items()}
+
+
+class ExcelWorkbook():
+    ''' Class to handle excel file
+    '''
+    def __init__(self, filename, read_only = False):
+        ''' Open the excel file
+            Only the table index is read here, the workbook itself is loaded on first need.
+        Args:
+            filename (str): excel file
+            read_only (bool): if True, open the file in streaming mode: cells are read row by row
+                              when a table is parsed instead of being all loaded in memory upfront,
+                              and only the worksheets containing parsed tables are read.
+                              The workbook should then be closed once done (see close())
+        '''
+        self._filename = filename
+        self._read_only = read_only
+        self._table_index = read_table_index(filename)
+        self._wb = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        ''' Close the excel file - only needed in read only mode
+        '''
+        if self._wb is not None:
+            self._wb.close()
+
+    @property
+    def _workbook(self):
+        ''' openpyxl workbook, loaded on first access
+        '''
+        if self._wb is None:
+            self._wb = load_workbook(filename = self._filename, data_only=True, read_only=self._read_only)
+        return self._wb
+
+    @property
+    def worksheets(self):
+        ''' Get the list of worksheet names
+        '''
+        return self._workbook.worksheets
+
+    @property
+    def tables(self):
+        ''' Get the table index: {table name: TableInfo} - does not require to load the workbook
+        '''
+        return self._table_index
+
+    def table_ws(self, table_name):
+        ''' Get the worksheet associated with a table name
+        '''
+        table_info = self._table_index.get(table_name)
+        if table_info is None:
+            return None
+        return self._workbook[table_info.sheet]
+
+    def get_table(self, table_name):
+        ''' Get the table object
+        '''
+        table_info = self._table_index.get(table_name)
+        if table_info is None:
+            return None
+        if self._read_only:
+            # read only worksheets do not expose their tables
+            return table_info.table
+        return self.table_ws(table_name).tables[table_name]
+
+    def table_row_count(self, table_name):
+        ''' Get the number of rows of a table, header excluded
+        '''
+        _, min_row, _, max_row = range_boundaries(self._table_index[table_name].ref)
+        return max_row - min_row
+
+    def _table_rows(self, table_name, first_row = 0, last_row = None, first_col = 0, last_col = None):
+        ''' Iterate over the values of a table rows, header excluded
+        Args:
+            table_name (str): name of the table in the excel file
+            first_row (int): index of the first row to read (0 being the row below the header)
+            last_row (int): index of the row to stop at (excluded) - None to read until table end
+            first_col (int): index of the first column to read
+            last_col (int): index of the column to stop at (excluded) - None to read until table end
+        Returns:
+            generator of tuple: cell values of each row
+        '''
+        ws = self.table_ws(table_name)
+        min_col, min_row, max_col, max_row = range_boundaries(self._table_index[table_name].ref)
+        min_row += 1 + first_row   #skip first row which is the header
+        if last_row is not None:
+            max_row = min(max_row, min_row - first_row + last_row - 1)
+        if last_col is not None:
+            max_col = min(max_col, min_col + last_col - 1)
+        min_col += first_col
+        if min_row > max_row:
+            return
+
+        if self._read_only and first_row > 0:
+            yield from _iter_sheet_rows(ws, min_row, max_row, min_col, max_col)
+        else:
+            yield from ws.iter_rows(min_row = min_row, max_row = max_row,
+                                    min_col = min_col, max_col = max_col,
+                                    values_only = True)
+
+    def infer_schema(self, table_name, sample_rows = 1000):
+        ''' Infer the type of each column of a table from its first rows
+        Args:
+            table_name (str): name of the table in the excel file
+            sample_rows (int): number of rows used to infer column types
+        Returns:
+            dict: {column name: key of COLUMN_TYPES}
+        '''
+        column_names = self._table_index[table_name].column_names
+        samples = [[] for _ in column_names]
+        for row in self._table_rows(table_name, last_row = sample_rows):
+            for sample, cell_value in zip(samples, row):
+                if cell_value is not None and cell_value != '':
+                    sample.append(cell_value)
+        return {name: _infer_column_type(name, sample) for name, sample in zip(column_names, samples)}
+
+    def _resolve_schema(self, table_name, schema):
+        ''' Get the type of each column of a table
+        Args:
+            schema: None, 'infer' or {column name: key of COLUMN_TYPES} - see iter_table()
+        Returns:
+            _ResolvedSchema: {column name: key of COLUMN_TYPES} - None if no schema
+        '''
+        if schema is None or isinstance(schema, _ResolvedSchema):
+            return schema
+        if schema == 'infer':
+            inferred = self.infer_schema(table_name)
+            return _ResolvedSchema(inferred, inferred)
+        if isinstance(schema, dict):
+            if set(self._table_index[table_name].column_names) <= set(schema):
+                # all column types are given, no need to infer any
+                return _ResolvedSchema(schema)
+            inferred = self.infer_schema(table_name)
+            return _ResolvedSchema(inferred | schema, set(inferred) - set(schema))
+        raise vbrExceptions.OtherException("schema parameter unknown (None, 'infer' or dict):", schema)
+
+    def iter_table(self, table_name,
+                   nested = True, with_ignored = False, first_row = 0, last_row = None, schema = None,
+                   columns = None, where = None):
+        ''' Iterate over the rows of an excel table, creating their dictionary one at a time
+            column names are used as keys with the following rules:
+                - dot '.' indicates dictionary structure - ignored if nested is False
+                - name under braket "[...]" indicates semicolon ";" separated multi-value data
+                - name starting with hash '#' is ignored - unless with_ignored is True
+        Args:
+            table_name (str): name of the table in the excel file
+            nested (bool): if True, create nested dictionary based on column names
+            with_ignored (bool): if True, keep columns starting with hash '#'
+            first_row (int): index of the first row to read (0 being the row below the header)
+            last_row (int): index of the row to stop at (excluded) - None to read until table end
+            schema: type of each column, values being converted accordingly (see COLUMN_TYPES),
+                    so that output only contains json native types:
+                    - None: values are kept as read, multi-value columns being split
+                    - 'infer': type of each column is inferred from the first table rows,
+                               later values not matching it being kept as read
+                    - {column name: type}: same as 'infer', with explicit types for some columns,
+                                           values not matching an explicit type raising an exception
+            columns (list of str): dotted keys or glob patterns of the columns to keep, a key also
+                                   selecting all its sub keys (e.g. ['entree', 'membre.id', 'compta.*'])
+                                   - None to keep all columns
+            where: filter applied on cell values as read, before the row dictionary is created
+                   - callable, taking a mapping {column key: cell value} and returning True to keep the row
+                   - str, conditions "<column key> <operator> <value>" joined with 'and'
+                     (operators: == != < <= > >=, value: number or string, possibly quoted)
+                     e.g. "status == done and count > 3"
+                   - None to keep all rows
+        Returns:
+            generator of dictionary: each entry corresponds to a row in the table
+        '''
+        row_builder, rows = self._compile_table(table_name, nested, with_ignored, first_row, last_row,
+                                                schema, columns, where)
+        return (row_builder.build(row) for row in rows)
+
+    def _compile_table(self, table_name, nested, with_ignored, first_row, last_row, schema, columns, where):
+        ''' Compile the header of a table & prepare the iteration over its (filtered) cell values
+            - see iter_table()
+        Returns:
+            tuple (_RowBuilder, generator of tuple)
+        '''
+        table_info = self._table_index.get(table_name)
+        if table_info is None:
+            raise vbrExceptions.OtherException('Table not found:', table_name)
+
+        # only read the column span needed by the output & the filter
+        column_names = table_info.column_names
+        used_cols = [col for col, name in enumerate(column_names) if _is_kept(name, with_ignored, columns)]
+        if where is not None:
+            used_cols += _RowFilter(where, column_names).columns
+        first_col, last_col = (min(used_cols), max(used_cols) + 1) if used_cols else (0, 1)
+        column_names = column_names[first_col:last_col]
+
+        # header is compiled right away, so that errors are raised before any row is read
+        column_types = self._resolve_schema(table_name, schema)
+        row_builder = _RowBuilder(column_names, nested = nested, with_ignored = with_ignored,
+                                  column_types = column_types, columns = columns,
+                                  inferred_columns = column_types.inferred if column_types else ())
+        rows = self._table_rows(table_name, first_row, last_row, first_col, last_col)
+        if where is not None:
+            rows = filter(_RowFilter(where, column_names).match, rows)
+        return row_builder, rows
+
+    def compact_table(self, table_name, nested = True, with_ignored = False,
+                      first_row = 0, last_row = None, schema = None, columns = None, where = None):
+        ''' Read an excel table in a memory compact form: values of each row are stored in a tuple,
+            all rows sharing the header compiled once, and repeated strings are stored once.
+            see iter_table() for arguments
+        Returns:
+            CompactTable: sequence of read only row views, each one behaving like the dictionary
+                          iter_table() creates for the same row
+        '''
+        row_builder, rows = self._compile_table(table_name, nested, with_ignored, first_row, last_row,
+                                                schema, columns, where)
+        return CompactTable(row_builder, rows)
+
+    def dict_from_table(self, table_name,
+                        nested = True, with_ignored = False, layout = 'rows', **kwargs):
+        ''' Create a dictionary from an excel table
+            see iter_table() for column names rules
+        Args:
+            table_name (str): name of the table in the excel file
+            nested (bool): if True, create nested dictionary based on column names
+            with_ignored (bool): if True, keep columns starting with hash '#'
+            layout (str): 'rows', 'columns' or 'compact'
+        Keyword Args:
+            All Optional keyword arguments that iter_table() takes (schema, columns, where, ...)
+        Returns:
+            if layout is 'rows', list of dictionary: each entry corresponds to a row in the table
+            if layout is 'columns', dictionary: {column: [value of each row]}, nested based on column names
+                                    (see dicjsontools.columns_from_rows() & rows_from_columns())
+            if layout is 'compact', CompactTable: see compact_table()
+        '''
+        if layout == 'compact':
+            return self.compact_table(table_name, nested = nested, with_ignored = with_ignored, **kwargs)
+        rows = self.iter_table(table_name, nested = nested, with_ignored = with_ignored, **kwargs)
+        if layout == 'columns':
+            return columns_from_rows(rows)
+        if layout != 'rows':
+            raise vbrExceptions.OtherException("layout parameter unknown ('rows', 'columns' or 'compact'):",
+                                               layout)
+        return list(rows)
+
+    def table_keys(self, table_names, **options):
+        ''' Compute a key for each table, hashing all archive parts its content depends on
+            (worksheet, table definition, workbook, shared strings & styles) and the conversion options.
+            Worksheets are not loaded.
+        Args:
+            table_names (list of str): names of the tables in the excel file
+            options: conversion options the table content depends on
+        Returns:
+            dict: {table name: key}
+        '''
+        part_hashes = {}
+        keys = {}
+        with ZipFile(self._filename) as archive:
+            for table_name in table_names:
+                table_info = self._table_index[table_name]
+                table_hash = hashlib.sha256(repr(sorted(options.items())).encode())
+                for part in (table_info.sheet_part, table_info.table_part) + table_info.workbook_parts:
+                    if part not in part_hashes:
+                        part_hash = hashlib.sha256()
+                        with archive.open(part) as part_ptr:
+                            while chunk := part_ptr.read(1 << 20):
+                                part_hash.update(chunk)
+                        part_hashes[part] = part_hash.digest()
+                    table_hash.update(part_hashes[part])
+                keys[table_name] = table_hash.hexdigest()
+        return keys
+
+    def iter_tables(self, table_names, jobs = 1, shard_rows = None, cache = None, **kwargs):
+        ''' Iterate over the rows of several excel tables, possibly in parallel.
+            With several jobs, tables are split in row range shards, each one being read by a
+            separate process. Rows are given back in their original order.
+        Args:
+            table_names (list of str): names of the tables in the excel file
+            jobs (int): number of processes - 1 to read tables in the current process, one after another
+            shard_rows (int): max number of rows per shard - None to share all rows evenly between jobs
+            cache (exceltojson.TableCache): if set, unchanged tables are read from this cache, without loading
+                                the workbook, and the others are stored in it once read.
+                                Not used if where is a callable, which cannot be part of the cache key
+        Keyword Args:
+            All Optional keyword arguments that iter_table() takes (nested, with_ignored, schema, ...)
+            With several jobs, a callable where must be picklable (e.g. module level function)
+        Returns:
+            dict of generator of dictionary: {table name: rows}, each generator being as iter_table()
+        '''
+        for table_name in table_names:
+            if table_name not in self._table_index:
+                raise vbrExceptions.OtherException('Table not found:', table_name)
+
+        if cache is None or callable(kwargs.get('where')):
+            return self._iter_tables(table_names, jobs, shard_rows, **kwargs)
+
+        keys = self.table_keys(table_names, **kwargs)
+        output = {table_name: cache.get(keys[table_name]) for table_name in table_names}
+        missing = [table_name for table_name, rows in output.items() if rows is None]
+        for table_name, rows in self._iter_tables(missing, jobs, shard_rows, **kwargs).items():
+            output[table_name] = cache.store(keys[table_name], rows)
+        return output
+
+    def _iter_tables(self, table_names, jobs, shard_rows, **kwargs):
+        ''' Iterate over the rows of several excel tables, possibly in parallel - see iter_tables()
+        '''
+        if jobs <= 1:
+            return {table_name: self.iter_table(table_name, **kwargs) for table_name in table_names}
+
+        row_counts = {table_name: self.table_row_count(table_name) for table_name in table_names}
+        shard_rows = shard_rows or max(1, ceil(sum(row_counts.values()) / jobs))
+
+        executor = ProcessPoolExecutor(max_workers = jobs)
+        shards = {}
+        for table_name in table_names:
+            # schema is resolved once, so that all shards of a table share the same column types
+            table_kwargs = kwargs | {'schema': self._resolve_schema(table_name, kwargs.get('schema'))}
+            shards[table_name] = [executor.submit(_read_table_shard, self._filename, table_name,
+                                                  first_row, first_row + shard_rows, **table_kwargs)
+                                  for first_row in range(0, max(row_counts[table_name], 1), shard_rows)]
+        # submitted shards are still processed, executor is released once they are all done
+        executor.shutdown(wait = False)
+
+        return {table_name: (row for shard in table_shards for row in shard.result())
+                for table_name, table_shards in shards.items()}
+
+    def dicts_from_tables(self, table_names, **kwargs):
+        ''' Create a dictionary from several excel tables, possibly in parallel
+        Keyword Args:
+            All Optional keyword arguments that iter_tables() takes
+        Returns:
+            dict of list of dictionary: {table name: rows}
+        '''
+        return {table_name: list(rows) for table_name, rows in self.iter_tables(table_names, **kwargs).items()}
+
+
+def _read_table_shard(filename, table_name, first_row, last_row, **kwargs):
+    ''' Read a row range of a table - executed in a separate process
+    '''
+    with ExcelWorkbook(filename, read_only = True) as wb:
+        return list(wb.iter_table(table_name, first_row = first_row, last_row = last_row, **kwargs))
+
+
+if __name__ == '__main__':
+    raise vbrExceptions.OtherException('This module should not be called directly.')
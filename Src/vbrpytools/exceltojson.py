@@ -4,109 +4,435 @@ json structure based on column names
     - dot '.' indicates dictionary structure
     - name under braket "[...]" indicates semicolon ";" separated multi-value data
     - name starting with hash '#' is ignored
+
+Workbook reading itself (table index, row streaming, cell conversion) is done by excelreader.
 '''
 
-from openpyxl import load_workbook
+import hashlib
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from glob import glob
+from multiprocessing import freeze_support
+from pathlib import Path
+from time import sleep
 
-from vbrpytools.dicjsontools import merge_dict, append_json_file, save_json_file, create_nested_dict
+from vbrpytools import exceptions as vbrExceptions
+from vbrpytools.dicjsontools import append_json_file, save_json_stream, columns_from_rows
+from vbrpytools.dicjsontools import load_json_file, save_json_file
+#pylint: disable=unused-import #public names of exceltojson, now implemented in excelreader
+from vbrpytools.excelreader import COLUMN_TYPES, CompactRow, CompactTable, ExcelWorkbook, TableInfo, read_table_index
+#pylint: enable=unused-import
 from vbrpytools.misctools import get_args
 from vbrpytools.misctools import force_stdout_encoding
 
-class ExcelWorkbook():
-    ''' Class to handle excel file
+class TableCache():
+    ''' On disk cache of table rows, keyed by a hash of the table content & conversion options
+        (see ExcelWorkbook.table_keys()). Least recently used entries are evicted once the cache
+        exceeds its max size.
     '''
-    def __init__(self, filename):
-        ''' Open the excel file
-        '''
-        self._wb = load_workbook(filename = filename, data_only=True)
+    _BATCH_ROWS = 1000
 
-    @property
-    def worksheets(self):
-        ''' Get the list of worksheet names
+    def __init__(self, cache_dir, max_size = 1 << 30):
+        ''' Open (or create) a cache directory
+        Args:
+            cache_dir (str): directory where cache entries are stored
+            max_size (int): max size of the cache, in bytes
         '''
-        return self._wb.worksheets
+        self._dir = Path(cache_dir)
+        self._dir.mkdir(parents = True, exist_ok = True)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
 
-    def table_ws(self, table_name):
-        ''' Get the worksheet associated with a table name
-        '''
-        for ws in self.worksheets:
-            if table_name in ws.tables.keys():
-                return ws
-        return None
+    def _entry(self, key):
+        return self._dir / f'{key}.rows'
 
-    def get_table(self, table_name):
-        ''' Get the table object
+    def get(self, key):
+        ''' Get the rows of a cache entry
+        Returns:
+            generator of dictionary: cached rows - None if key is not in cache
         '''
-        ws = self.table_ws(table_name)
-        if ws is None:
+        entry = self._entry(key)
+        try:
+            # opened now: rows stay readable if entry is evicted (e.g. by storing another table) before
+            # they are iterated
+            file_ptr = open(entry, 'rb')    #pylint: disable=consider-using-with #closed by _read()
+        except FileNotFoundError:
+            self.misses += 1
             return None
-        return ws.tables[table_name]
-
-    def dict_from_table(self, table_name,
-                        nested = True, with_ignored = False):
-        ''' Create a dictionary from an excel table
-            column names are used as keys with the following rules:
-                - dot '.' indicates dictionary structure - ignored if nested is False
-                - name under braket "[...]" indicates semicolon ";" separated multi-value data
-                - name starting with hash '#' is ignored - unless with_ignored is True
+        self.hits += 1
+        # mark entry as recently used
+        os.utime(entry)
+        return self._read(file_ptr)
+
+    @staticmethod
+    def _read(file_ptr):
+        with file_ptr:
+            while True:
+                try:
+                    yield from pickle.load(file_ptr)
+                except EOFError:
+                    return
+
+    def store(self, key, rows):
+        ''' Store rows in a cache entry while iterating over them
+            Entry is only created once all rows are iterated.
         Args:
-            table_name (str): name of the table in the excel file
-            nested (bool): if True, create nested dictionary based on column names
+            key (str): cache key
+            rows (iterable of dictionary): rows to store
         Returns:
-            list of dictionary: each entry corresponds to a row in the table
+            generator of dictionary: rows
+        '''
+        entry = self._entry(key)
+        tmp_entry = entry.with_suffix(f'.{os.getpid()}.tmp')
+        try:
+            with open(tmp_entry, 'wb') as file_ptr:
+                batch = []
+                for row in rows:
+                    batch.append(row)
+                    if len(batch) >= self._BATCH_ROWS:
+                        pickle.dump(batch, file_ptr, protocol = pickle.HIGHEST_PROTOCOL)
+                        batch = []
+                    yield row
+                pickle.dump(batch, file_ptr, protocol = pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_entry, entry)
+        finally:
+            tmp_entry.unlink(missing_ok = True)
+        self.evict()
+
+    def evict(self):
+        ''' Remove least recently used entries until cache size is below its max size
         '''
+        entries = sorted(((e.stat().st_mtime, e.stat().st_size, e) for e in self._dir.glob('*.rows')),
+                         key = lambda e: e[0])
+        size = sum(e[1] for e in entries)
+        for _, entry_size, entry in entries:
+            if size <= self.max_size:
+                break
+            try:
+                entry.unlink(missing_ok = True)
+            except PermissionError:
+                # entry being read (windows): evicted next time
+                continue
+            size -= entry_size
+
+
+def _parse_schema(schema_arg):
+    ''' Parse schema command line argument: 'infer' or comma separated column=type list
+    '''
+    if schema_arg is None or schema_arg == 'infer':
+        return schema_arg
+    return dict(column_type.rsplit('=', 1) for column_type in schema_arg.split(','))
+
+OUTPUT_FORMATS = ('json', 'jsonl')
+
+
+def json_lines_files(outputfile, table_names):
+    ''' Get the json lines files tables are saved in with the jsonl output format (see convert_workbook())
+    Args:
+        outputfile (str): json file, giving the directory & stem of the json lines files
+        table_names (list of str): names of the tables
+    Returns:
+        dict: {table name: Path of {output file stem}.{table name}.jsonl}
+    '''
+    outputfile = Path(outputfile)
+    return {table_name: outputfile.with_name(f'{outputfile.stem}.{table_name}.jsonl') for table_name in table_names}
+
+
+def _outputs_exist(outputfile, table_names, output_format = 'json'):
+    ''' Check if the output files of convert_workbook() exist
+    '''
+    if output_format == 'jsonl':
+        return all(path.exists() for path in json_lines_files(outputfile, table_names).values())
+    return Path(outputfile).exists()
+
+
+def convert_workbook(inputfile, table_names, outputfile, preserve = False, append = False, layout = 'rows',
+                     jobs = 1, cache = None, journal = False, indent = 4, output_format = 'json', snapshot = False,
+                     **kwargs):
+    ''' Save tables of an excel file in a json file {table name: rows}
+        or, with jsonl output format, each table in a json lines file, one row per line
+    Args:
+        inputfile (str): excel file
+        table_names (list of str): names of the tables in the excel file
+        outputfile (str): json file
+        preserve (bool): if True and output file exists, rename it by adding timestamp to it
+        append (bool): if True and output file exists, append new content to it
+        layout (str): 'rows' or 'columns' - see ExcelWorkbook.dict_from_table()
+        jobs (int): number of processes used to read tables - see ExcelWorkbook.iter_tables()
+        cache (TableCache): cache of table rows - see ExcelWorkbook.iter_tables()
+        journal (bool): if True, appended content is written in the output file journal
+                        - see dicjsontools.append_json_file()
+        indent (int): json file indentation - None for compact json (faster)
+        output_format (str): 'json' or 'jsonl': each table in its own json lines file, one compact row per line
+                             (see json_lines_files()), appending only adding new rows at the end of the files
+        snapshot (bool): json output format only: if True, also save a binary snapshot of the json file,
+                         reloaded faster by dicjsontools.load_json_file() - see dicjsontools.save_json_file()
+    Keyword Args:
+        All Optional keyword arguments that ExcelWorkbook.iter_table() takes (nested, schema, where, ...)
+    '''
+    if output_format not in OUTPUT_FORMATS:
+        raise vbrExceptions.OtherException('Unknown output format:', output_format)
+    if output_format == 'jsonl' and layout != 'rows':
+        raise vbrExceptions.OtherException('jsonl output format requires rows layout')
+    with ExcelWorkbook(inputfile, read_only=True) as wb:
+        output = wb.iter_tables(table_names, jobs=jobs, cache=cache, **kwargs)
+        if output_format == 'jsonl':
+            output_files = json_lines_files(outputfile, output)
+            for table_name, rows in output.items():
+                # rows are written while being read, in a temporary file replacing existing one once all are,
+                # appended ones once all are read (so that a failing read leaves the file as is)
+                if append:
+                    append_json_file(output_files[table_name], list(rows))
+                else:
+                    save_json_file(rows, output_files[table_name], preserve=preserve)
+            return
+        if layout == 'columns':
+            output = {table_name: columns_from_rows(rows) for table_name, rows in output.items()}
+        if append:
+            # appending requires merging with existing content, so all rows are needed
+            output = {table_name: rows if isinstance(rows, dict) else list(rows)
+                      for table_name, rows in output.items()}
+            append_json_file(outputfile, output, preserve=preserve, journal=journal, indent=indent,
+                             snapshot=snapshot)
+        else:
+            # rows are written while being read
+            save_json_stream(output, outputfile, preserve=preserve, indent=indent, snapshot=snapshot)
+
+
+def watch_workbook(inputfile, table_names, outputfile, preserve = False, layout = 'rows', indent = 4,
+                   interval = 0.5, debounce = 0.5, **kwargs):
+    ''' Save tables of an excel file in a json file, then save them again each time the excel file changes,
+        until interrupted (KeyboardInterrupt).
+        Excel file is polled, and read once its modification time & size are stable for the debounce delay.
+        If reading it fails (e.g. file still being written), the error is logged and reading is retried
+        at next poll.
+        Only tables whose content changed (see ExcelWorkbook.table_keys()) are read again,
+        the others being kept in memory.
+    Args:
+        inputfile (str): excel file
+        table_names (list of str): names of the tables in the excel file
+        outputfile (str): json file
+        preserve (bool): if True and output file exists, rename it by adding timestamp to it
+        layout (str): 'rows' or 'columns' - see ExcelWorkbook.dict_from_table()
+        indent (int): json file indentation - None for compact json (faster)
+        interval (float): polling period, in seconds
+        debounce (float): delay without change before reading the excel file, in seconds
+    Keyword Args:
+        All Optional keyword arguments that ExcelWorkbook.iter_tables() takes (jobs, nested, schema, ...)
+    '''
+    inputfile = Path(inputfile)
+    tables = {}     # {table name: (table key, content)}
+    converted_state = None
+    failed_state = None
+
+    def file_state():
+        try:
+            stat = inputfile.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    while True:
+        state = file_state()
+        if state is not None and state != converted_state:
+            # let the excel file be completely written
+            sleep(debounce)
+            if file_state() != state:
+                continue
+            try:
+                updated = _update_tables(inputfile, table_names, outputfile, tables, preserve, layout, indent,
+                                         **kwargs)
+            except Exception as exc:    #pylint: disable=broad-exception-caught #any parsing error, retried at next poll
+                # logged once per file state, not at each retry
+                if state != failed_state:
+                    print(f'{datetime.now():%H:%M:%S} {inputfile}: {type(exc).__name__}: {exc}')
+                failed_state = state
+            else:
+                print(f'{datetime.now():%H:%M:%S} {inputfile}: ' +
+                      (f'updated {", ".join(updated)}' if updated else 'no table changed'))
+                converted_state = state
+        sleep(interval)
+
+
+def _update_tables(inputfile, table_names, outputfile, tables, preserve, layout, indent, **kwargs):
+    ''' Read again the tables that changed & save all tables - see watch_workbook()
+    Returns:
+        list of str: names of the changed tables
+    '''
+    with ExcelWorkbook(inputfile, read_only=True) as wb:
+        keys = wb.table_keys(table_names)
+        updated = [table_name for table_name in table_names
+                   if table_name not in tables or tables[table_name][0] != keys[table_name]]
+        for table_name, rows in wb.iter_tables(updated, **kwargs).items():
+            tables[table_name] = (keys[table_name], columns_from_rows(rows) if layout == 'columns' else list(rows))
+    if updated:
+        save_json_file({table_name: tables[table_name][1] for table_name in table_names}, outputfile,
+                       preserve = preserve, indent = indent)
+    return updated
+
+
+def _file_hash(filename):
+    ''' sha256 of a file content
+    '''
+    file_hash = hashlib.sha256()
+    with open(filename, 'rb') as file_ptr:
+        while chunk := file_ptr.read(1 << 20):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def _convert_batch_workbook(inputfile, previous_hash, table_names, outputfile, **kwargs):
+    ''' Convert a workbook of a batch, unless its content did not change - executed in a separate process
+    Returns:
+        tuple (bool: converted, str: content hash)
+    '''
+    content_hash = _file_hash(inputfile)
+    if content_hash == previous_hash and _outputs_exist(outputfile, table_names, kwargs.get('output_format', 'json')):
+        return False, content_hash
+    convert_workbook(inputfile, table_names, outputfile, **kwargs)
+    return True, content_hash
+
+
+def convert_workbooks(inputs, table_names, output_dir, jobs = None, manifest = None, **kwargs):
+    ''' Save tables of several excel files, each one in a json file {output_dir}/{excel file stem}.json,
+        using a pool of processes, one excel file per process.
+        A manifest keeps the modification time, size & content hash of converted excel files, so that
+        unchanged ones are skipped on next batch.
+    Args:
+        inputs (str): directory (all its .xlsx files) or glob pattern of the excel files
+        table_names (list of str): names of the tables in each excel file
+        output_dir (str): directory of the json files
+        jobs (int): number of processes - None to use all cores
+        manifest (str): manifest json file - None for {output_dir}/exceltojson_manifest.json
+    Keyword Args:
+        All Optional keyword arguments that convert_workbook() takes, except jobs
+        (cache directory being shared by all processes)
+        with jsonl output format, each table is saved in {output_dir}/{excel file stem}.{table name}.jsonl
+    Returns:
+        dict: {excel file: 'converted', 'unchanged' or error message}
+    Raises:
+        OtherException: if several excel files have the same name (e.g. glob pattern spanning directories)
+    '''
+    input_path = Path(inputs)
+    if input_path.is_dir():
+        inputfiles = sorted(input_path.glob('*.xlsx'))
+    else:
+        inputfiles = sorted(Path(name) for name in glob(inputs))
+    # skip files excel creates while a workbook is open
+    inputfiles = [inputfile.resolve() for inputfile in inputfiles if not inputfile.name.startswith('~$')]
+    # output files are named after excel file stems (case insensitive on Windows)
+    stems = {}
+    for inputfile in inputfiles:
+        stems.setdefault(os.path.normcase(inputfile.stem), []).append(str(inputfile))
+    duplicates = [files for files in stems.values() if len(files) > 1]
+    if duplicates:
+        raise vbrExceptions.OtherException('Excel files with the same name would be saved in the same json file:',
+                                           duplicates)
+
+    output_dir = Path(output_dir)
+    manifest = Path(manifest) if manifest else output_dir / 'exceltojson_manifest.json'
+    entries = load_json_file(manifest) if manifest.exists() else {}
+    # output depends on the conversion options as well
+    options = sorted((key, value) for key, value in kwargs.items() if key not in ('cache', 'preserve'))
+    options_hash = hashlib.sha256(repr((table_names, options)).encode()).hexdigest()
+
+    status = dict.fromkeys(map(str, inputfiles))
+    executor = ProcessPoolExecutor(max_workers = jobs)
+    futures = {}
+    for inputfile in inputfiles:
+        outputfile = output_dir / (inputfile.stem + '.json')
+        stat = inputfile.stat()
+        entry = entries.get(str(inputfile))
+        if (entry is not None and entry['options'] == options_hash
+                and _outputs_exist(outputfile, table_names, kwargs.get('output_format', 'json'))):
+            if (entry['mtime'], entry['size']) == (stat.st_mtime, stat.st_size):
+                status[str(inputfile)] = 'unchanged'
+                continue
+            previous_hash = entry['sha256']
+        else:
+            previous_hash = None
+        futures[executor.submit(_convert_batch_workbook, inputfile, previous_hash, table_names, outputfile,
+                                **kwargs)] = (inputfile, stat)
+
+    for future in as_completed(futures):
+        inputfile, stat = futures[future]
+        try:
+            converted, content_hash = future.result()
+        except Exception as exc:    #pylint: disable=broad-exception-caught #reported, other files still converted
+            status[str(inputfile)] = f'{type(exc).__name__}: {exc}'
+            entries.pop(str(inputfile), None)
+        else:
+            status[str(inputfile)] = 'converted' if converted else 'unchanged'
+            entries[str(inputfile)] = {'mtime': stat.st_mtime, 'size': stat.st_size,
+                                       'sha256': content_hash, 'options': options_hash}
+        # saved after each file, so that an interrupted batch is resumed where it stopped
+        save_json_file(entries, manifest, preserve = False)
+    executor.shutdown()
+    return status
 
-        ws = self.table_ws(table_name)
-        in_table = ws.tables[table_name]
-        in_range = ws[in_table.ref]
-        column_names = in_table.column_names
-
-        output = []
-        for row in in_range[1:]: #skip first row which is the header
-            output_entry = {}
-            for name, row_cell in zip(column_names, row):
-                cell_value = row_cell.value
-                if (cell_value is not None) and (cell_value != '') and\
-                   ((name[0] != '#') or with_ignored):
-                    if name[0] == '[' and name[-1] == ']':
-                        multivalue = True
-                        name = name[1:-1]
-                    else:
-                        multivalue = False
-
-                    keys = name.split('.') if nested else [name]
-
-                    # Detect multi value content
-                    if multivalue:
-                        if str(cell_value).isnumeric():
-                            cell_value = [cell_value]
-                        else:
-                            cell_value = str(cell_value).split(';')
-
-                    output_entry_key = create_nested_dict(keys, cell_value)
-                    output_entry = merge_dict(output_entry, output_entry_key)
-
-            output.append(output_entry)
-        return output
 
 def _main():
     ''' Entry point of this module
     '''
     force_stdout_encoding()
-    args_def = [(['-f', '--inputfile'     ], {'action':'store',                       'required':True , 'help':'Input Filename (xlsx) of the table',                           'metavar':'xxx.xlsx'}),
-                (['-t', '--inputtable'    ], {'action':'store',                       'required':True , 'help':'list of comma separated input table names',                    'metavar':'xxx,yyy' }),
-                (['-o', '--outputfile'    ], {'action':'store',                       'required':True , 'help':'Output Filename (json)',                                       'metavar':'xxx.json'}),
+    args_def = [(['-t', '--inputtable'    ], {'action':'store',                       'required':True , 'help':'list of comma separated input table names',                    'metavar':'xxx,yyy' }),
+                (['-o', '--outputfile'    ], {'action':'store',                       'required':True , 'help':'Output Filename (json)\nin batch mode, output directory',          'metavar':'xxx.json'}),
                 (['-p', '--preserve'      ], {'action':'store_true', 'default':False, 'required':False, 'help':'if set and output file exists, rename it by adding timestamp'                      }),
                 (['-a', '--append'        ], {'action':'store_true', 'default':False, 'required':False, 'help':'if set and output file exists, append new content to it'                           }),
+                (['--compact'             ], {'action':'store_true', 'default':False, 'required':False, 'help':'write compact json (no indentation), several times faster'                        }),
+                (['--journal'             ], {'action':'store_true', 'default':False, 'required':False, 'help':'with append, write new content in output file journal ({output file}.journal)\ninstead of rewriting output file'}),
+                (['--snapshot'            ], {'action':'store_true', 'default':False, 'required':False, 'help':'also save a binary snapshot of output file ({output file}.snapshot),\nreloaded several times faster by dicjsontools.load_json_file()'}),
+                (['-j', '--jobs'          ], {'action':'store',      'default':None,  'required':False, 'help':'number of processes used to read tables in parallel - default 1\nin batch mode, to convert files in parallel - default: number of cores', 'metavar':'N', 'type':int}),
+                (['--watch'               ], {'action':'store_true', 'default':False, 'required':False, 'help':'keep running, saving tables again each time the input file changes'                   }),
+                (['--interval'            ], {'action':'store',      'default':0.5,   'required':False, 'help':'watch mode polling period - default: 0.5s',                    'metavar':'s', 'type':float}),
+                (['-m', '--manifest'      ], {'action':'store',      'default':None,  'required':False, 'help':'batch mode manifest, to skip unchanged files - default: exceltojson_manifest.json in output directory', 'metavar':'xxx.json'}),
+                (['-c', '--cache'         ], {'action':'store',      'default':None,  'required':False, 'help':'cache directory - unchanged tables are read from it',          'metavar':'dir'}),
+                (['--cache-size'          ], {'action':'store',      'default':1024,  'required':False, 'help':'max cache size, least recently used tables are evicted',       'metavar':'MB', 'type':int}),
+                (['--format'              ], {'action':'store',      'default':'json','required':False, 'help':'json: tables in output file\njsonl: each table in {output file stem}.{table}.jsonl, one row per line', 'choices':list(OUTPUT_FORMATS)}),
+                (['-l', '--layout'        ], {'action':'store',      'default':'rows','required':False, 'help':'rows: list of rows per table\ncolumns: list of values per column per table', 'choices':['rows', 'columns']}),
+                (['--columns'             ], {'action':'store',      'default':None,  'required':False, 'help':'list of comma separated dotted keys or glob patterns of the columns to keep', 'metavar':'xxx.yyy,zzz.*'}),
+                (['-w', '--where'         ], {'action':'store',      'default':None,  'required':False, 'help':'only keep rows matching conditions joined with and\n(operators: == != < <= > >=)', 'metavar':'"xxx == yyy and ..."'}),
+                (['-s', '--schema'        ], {'action':'store',      'default':None,  'required':False, 'help':'convert values to the type of their column\ninfer: types inferred from first rows\ncolumn=type,...: same, with explicit types ('+ ', '.join(COLUMN_TYPES) + ')', 'metavar':'infer|xxx=type,...'}),
                ]
-    args = get_args(args_def)
+    excl_args_def = [[(['-f', '--inputfile'     ], {'action':'store',                       'required':False, 'help':'Input Filename (xlsx) of the table',                           'metavar':'xxx.xlsx'}),
+                      (['-b', '--batch'         ], {'action':'store',                       'required':False, 'help':'batch mode: directory or glob pattern of input files (xlsx)\neach one saved in {output directory}/{input file name}.json', 'metavar':'dir|xxx*.xlsx'}),
+                    ]]
+    args = get_args(args_def, excl_arg_lists = excl_args_def)
+    if args.inputfile is None and args.batch is None:
+        raise vbrExceptions.OtherException('Input file or batch is required')
 
-    wb = ExcelWorkbook(args.inputfile)
-    output = {table_name: wb.dict_from_table(table_name) for table_name in args.inputtable.split(',')}
-    if args.append:
-        append_json_file(args.outputfile, output, preserve=args.preserve)
-    else:
-        save_json_file(output, args.outputfile, preserve=args.preserve)
+    cache = TableCache(args.cache, max_size = args.cache_size << 20) if args.cache else None
+    options = {'preserve': args.preserve, 'append': args.append, 'journal': args.journal,
+               'layout': args.layout, 'cache': cache, 'indent': None if args.compact else 4,
+               'schema': _parse_schema(args.schema),
+               'columns': args.columns.split(',') if args.columns else None,
+               'where': args.where, 'output_format': args.format, 'snapshot': args.snapshot}
+
+    if args.watch:
+        if args.batch is not None or args.append or args.format != 'json' or args.snapshot:
+            raise vbrExceptions.OtherException('Watch mode is not compatible with batch, append, jsonl format or snapshot')
+        del options['append'], options['journal'], options['output_format'], options['snapshot']
+        try:
+            watch_workbook(args.inputfile, args.inputtable.split(','), args.outputfile,
+                           interval=args.interval, jobs=args.jobs or 1, **options)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    if args.batch is not None:
+        status = convert_workbooks(args.batch, args.inputtable.split(','), args.outputfile,
+                                   jobs=args.jobs, manifest=args.manifest, **options)
+        for inputfile, file_status in status.items():
+            print(f'{inputfile}: {file_status}')
+        return
+
+    convert_workbook(args.inputfile, args.inputtable.split(','), args.outputfile, jobs=args.jobs or 1, **options)
+    if cache is not None:
+        print(f'cache: {cache.hits} hit(s), {cache.misses} miss(es)')
 
 if __name__ == "__main__":
+    freeze_support()
     _main()
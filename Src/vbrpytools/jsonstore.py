@@ -0,0 +1,800 @@
+"""
+support library to store dictionaries in json files - see dicjsontools
+- json file load, save, update (journal of appended entries, spool of concurrent appends)
+- binary snapshots, json lines files
+- json encoding of the types json does not support
+"""
+
+import gc
+import json
+import marshal
+import os
+import pickle
+import tempfile
+from collections.abc import Iterator, Mapping, Sequence
+from contextlib import contextmanager
+from datetime import date, datetime, time
+from itertools import groupby
+from json.encoder import c_make_encoder, encode_basestring_ascii
+from pathlib import Path
+from time import time_ns
+
+from vbrpytools import exceptions as vbrExceptions
+from vbrpytools.dictools import FlatDict, apply_patch, diff_dict, merge_dict, merge_many
+from vbrpytools.dictools import _keys_hook, _key_converter
+from vbrpytools.misctools import lock_file, open_preserve, timestamp_filename
+
+
+
+def _json_key(key):
+    """Encode a key as json does for dictionary keys
+    """
+    return key if isinstance(key, str) else json.dumps(key)
+
+
+def _journal_file(filename):
+    """Get the journal file of a json file: {filename}.journal
+    """
+    filename = Path(filename)
+    return filename.with_name(filename.name + '.journal')
+
+
+def _iter_journal(filename, key_as_int = True, start = 0):
+    """Iterate over the entries of the journal of a json file, if any
+    Keys are converted with key conversion policy key_as_int - see load_json_file()
+
+    @args:
+        start:          byte offset of the first entry to read
+    @returns: generator of dict {'options': dictools.merge_dict() keyword arguments, 'data': merged content}
+                             or {'options': dictools.apply_patch() keyword arguments, 'patch': patch}
+    """
+    object_hook = _keys_hook(key_as_int)
+    convert_key = _key_converter(key_as_int)
+    try:
+        with open_preserve(_journal_file(filename), 'rb', encoding = None) as file_ptr:
+            file_ptr.seek(start)
+            for line in file_ptr:
+                try:
+                    entry = json.loads(line, object_hook = object_hook)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    # an interrupted append can only leave an incomplete last entry
+                    if line.endswith(b'\n'):
+                        raise
+                    continue
+                if 'patch' in entry:
+                    # patch paths are lists of json keys
+                    entry['patch'] = [[op, [convert_key(key) for key in path], *value]
+                                      for op, path, *value in entry['patch']]
+                yield entry
+    except FileNotFoundError:
+        # no journal, no entry
+        pass
+
+
+def _snapshot_file(filename):
+    """Get the snapshot file of a json file: {filename}.snapshot
+    """
+    filename = Path(filename)
+    return filename.with_name(filename.name + '.snapshot')
+
+
+_SNAPSHOT_MAGIC = b'vbrpytools json snapshot 2\n'
+
+
+def _file_state(filename):
+    """Get the modification time (ns) & size of a file - None if it does not exist
+    """
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _snapshot_states(filename):
+    """Get the states of a json file & of its journal a snapshot is valid for
+    """
+    return _file_state(filename), _file_state(_journal_file(filename))
+
+
+def _read_snapshot(filename, header_only = False):
+    """Read the snapshot of a json file (see _save_snapshot()), if it is still valid:
+    json file unchanged, journal unchanged or only appended since the snapshot
+
+    @returns: tuple (content - None if header_only, journal size when saved) - None if no valid snapshot
+    """
+    file_state, journal_state = _snapshot_states(filename)
+    if file_state is None and journal_state is None:
+        return None
+    journal_size = 0 if journal_state is None else journal_state[1]
+    try:
+        with open(_snapshot_file(filename), 'rb') as file_ptr:
+            if file_ptr.read(len(_SNAPSHOT_MAGIC)) != _SNAPSHOT_MAGIC:
+                return None
+            header = marshal.load(file_ptr)
+            if header['file'] != file_state or header['journal'] > journal_size:
+                return None
+            if header_only:
+                return None, header['journal']
+            # unmarshalled content has no reference cycle: collector passes triggered by its allocations
+            # would only slow loading down
+            gc_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                return marshal.load(file_ptr), header['journal']
+            finally:
+                if gc_enabled:
+                    gc.enable()
+    except FileNotFoundError:
+        return None
+    except Exception:    #pylint: disable=broad-exception-caught #unreadable snapshot, json file is loaded instead
+        return None
+
+
+def _save_snapshot(filename):
+    """Save a binary snapshot of a json file ({filename}.snapshot): its content as loaded by load_json_file()
+    with default key conversion, marshalled (int keys kept, nothing to parse nor convert when reloaded),
+    after a header with the states of the json file & of its journal the snapshot is valid for
+    marshal only reads back plain values (dict, list, str, number...): unlike pickle, reading a snapshot
+    cannot build arbitrary objects nor run code, whoever wrote it
+    """
+    states = _snapshot_states(filename)
+    json_data = load_json_file(filename, key_as_int=True)
+    if _snapshot_states(filename) != states:
+        # file changed while being loaded
+        return
+    snapshot_file = _snapshot_file(filename)
+    temp_file = snapshot_file.with_name(snapshot_file.name + '.tmp')
+    with open(temp_file, 'wb') as file_ptr:
+        file_ptr.write(_SNAPSHOT_MAGIC)
+        marshal.dump({'file': states[0], 'journal': 0 if states[1] is None else states[1][1]}, file_ptr)
+        marshal.dump(json_data, file_ptr)
+    # never a partially written snapshot
+    os.replace(temp_file, snapshot_file)
+
+
+def _is_json_lines(filename):
+    """Check if a file is a json lines file (.jsonl): one json value (e.g. table row) per line
+    """
+    return Path(filename).suffix.lower() == '.jsonl'
+
+
+def _iter_json_lines(file_ptr, key_as_int, start, end):
+    try:
+        decoder = json.JSONDecoder(object_hook = _keys_hook(key_as_int))
+        file_ptr.seek(max(start - 1, 0))
+        if start > 0:
+            # start of the first line beginning at or after start
+            file_ptr.readline()
+        pos = file_ptr.tell()
+        for line in file_ptr:
+            if end is not None and pos >= end:
+                return
+            pos += len(line)
+            if not line.endswith(b'\n'):
+                # an interrupted append can only leave an incomplete last line
+                try:
+                    value = decoder.decode(line.decode('utf-8'))
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    return
+                yield value
+            elif line.strip():
+                yield decoder.decode(line.decode('utf-8'))
+    finally:
+        file_ptr.close()
+
+
+def iter_json_lines(filename, key_as_int=True, start = 0, end = None):
+    """Iterate over the values (e.g. table rows) of a json lines file (.jsonl), one per line,
+    reading the file line by line
+
+    @args:
+        filename:       json lines file
+        key_as_int:     key conversion policy - see load_json_file()
+        start, end:     byte offsets: only the lines starting in [start, end[ are read
+                        (see split_json_lines() to read a file in parallel)
+    @returns: generator of values - file is opened at once, so a missing file raises immediately
+    """
+    return _iter_json_lines(open(filename, 'rb'), key_as_int, start, end)
+
+
+def split_json_lines(filename, parts):
+    """Split a json lines file (.jsonl) in byte ranges of about the same size, each one starting
+    at a line start, so that they can be read in parallel by iter_json_lines()
+
+    @returns: list of (start, end) byte offsets
+    """
+    size = os.path.getsize(filename)
+    offsets = [0]
+    with open(filename, 'rb') as file_ptr:
+        for part in range(1, parts):
+            file_ptr.seek(max(size * part // parts - 1, offsets[-1]))
+            file_ptr.readline()
+            offsets.append(min(file_ptr.tell(), size))
+    offsets.append(size)
+    return [(start, end) for start, end in zip(offsets, offsets[1:]) if start < end]
+
+
+def load_json_file(filename, key_as_int=True, abort_on_file_missing = True, lazy = False):
+    """Load a json file into a dictionary with key conversion
+    Supports empty file
+    Content appended in the journal of the file (see append_json_file()) is merged in the dictionary
+    Keys are converted while parsing, in all dictionaries (including the ones in lists)
+    A json lines file (.jsonl) is loaded as the list of its values (e.g. table rows)
+
+    @args:
+        filename:               file where to store content
+        key_as_int:             key conversion policy
+                                - if true, convert all keys made of decimal digits to integers
+                                - if false, keep keys as read
+                                - if callable, function converting each key
+        abort_on_file_missing:  if true and file is missing raise an exception, otherwise, return None
+        lazy:                   json lines file only: if true, returns an iterator reading values
+                                line by line (see iter_json_lines())
+
+    With default key conversion, content is read from the binary snapshot of the file if it is still valid
+    (see save_json_file()): same content, several times faster, only journal entries appended since
+    the snapshot being parsed
+    """
+    if _is_json_lines(filename):
+        try:
+            rows = iter_json_lines(filename, key_as_int)
+        except FileNotFoundError:
+            if abort_on_file_missing:
+                raise
+            return None
+        return rows if lazy else list(rows)
+
+    snapshot = _read_snapshot(filename) if key_as_int is True else None
+    if snapshot is not None:
+        json_data, journal_start = snapshot
+    else:
+        json_data, journal_start = {}, 0
+        try:
+            with open_preserve(filename, 'r') as file_ptr:
+                # check if file is empty, json load raising JSONDecodeError on empty content
+                if os.fstat(file_ptr.fileno()).st_size > 0:
+                    json_data = json.load(file_ptr, object_hook = _keys_hook(key_as_int))
+        except FileNotFoundError:
+            if not _journal_file(filename).exists():
+                if abort_on_file_missing:
+                    raise
+                return None
+
+    # consecutive entries with same options are merged in one traversal
+    for (options, is_patch), entries in groupby(_iter_journal(filename, key_as_int, journal_start),
+                                                key = lambda entry: (entry['options'], 'patch' in entry)):
+        if is_patch:
+            for entry in entries:
+                json_data = apply_patch(json_data, entry['patch'], **options)
+        else:
+            json_data = merge_many([json_data] + [entry['data'] for entry in entries], **options)
+    return json_data
+
+
+def compact_json_file(filename, indent = 4, preserve = False, snapshot = False):
+    """Merge the journal of a json file (see append_json_file()) into the file, then remove the journal
+
+    @args:
+        filename:       json file
+        indent:         formating of json file
+        preserve:       if True rename existing file by adding timestamp to it
+        snapshot:       if True, save a binary snapshot of the file - see save_json_file()
+    """
+    journal_file = _journal_file(filename)
+    if not journal_file.exists():
+        return
+    json_data = load_json_file(filename, key_as_int=True)
+    _snapshot_file(filename).unlink(missing_ok = True)
+    with _replaced_file(filename, preserve) as file_ptr:
+        _dump_json(json_data, file_ptr, indent = indent)
+    journal_file.unlink()
+    if snapshot:
+        _save_snapshot(filename)
+
+
+@contextmanager
+def _replaced_file(filename, preserve):
+    """Open a temporary file in the directory of a file, renamed as the file once written without error:
+    file is never partially written, and kept as is if writing fails (e.g. content being read raising)
+    If preserve, existing file is renamed by adding timestamp to it, as open_preserve() does
+    """
+    filename = Path(filename)
+    filename.parent.mkdir(parents = True, exist_ok = True)
+    # unique name, so that concurrent writers do not share it
+    temp_file = filename.with_name(f'{filename.name}.{os.getpid()}.{time_ns()}.tmp')
+    try:
+        with open(temp_file, 'x', encoding="utf-8") as file_ptr:
+            yield file_ptr
+        if preserve:
+            timestamp_filename(filename)
+        os.replace(temp_file, filename)
+    finally:
+        temp_file.unlink(missing_ok = True)
+
+
+def _drop_journal(filename, preserve):
+    """Remove the journal & the snapshot of a json file about to be overwritten.
+    If the file is preserved, journal is preserved as well (renamed with timestamp)
+    """
+    if preserve:
+        timestamp_filename(_journal_file(filename))
+    else:
+        _journal_file(filename).unlink(missing_ok = True)
+    _snapshot_file(filename).unlink(missing_ok = True)
+
+
+def _mapping_to_dict(mapping):
+    """Convert a mapping (e.g. exceltojson.CompactTable row view) to a dictionary
+    """
+    return mapping.to_dict() if hasattr(mapping, 'to_dict') else dict(mapping)
+
+
+def _not_json_serializable(value):
+    """Refuse to convert a value json does not support
+    """
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+# conversion of the types json does not support, to json serializable values (see register_json_type())
+# bytes-like values are sequences of int, but binary content: not saved unless their type is registered
+_JSON_TYPES = {set:         list,
+               frozenset:   list,
+               datetime:    datetime.isoformat,
+               date:        date.isoformat,
+               time:        time.isoformat,
+               FlatDict:    FlatDict.to_nested,
+               bytes:       _not_json_serializable,
+               bytearray:   _not_json_serializable,
+               memoryview:  _not_json_serializable,
+               Mapping:     _mapping_to_dict,
+               Sequence:    list}
+# conversion function of each type already met, to avoid looking for it again
+_json_converters = {}
+
+
+def register_json_type(json_type, converter):
+    """Register how to save in json a type json does not support
+    Type is also used for its sub classes, unless they are registered as well.
+
+    @args:
+        json_type:      type (or abstract base class) to convert
+        converter:      function converting a json_type value to a json serializable value
+                        e.g. register_json_type(Decimal, float), register_json_type(Path, str)
+    """
+    _JSON_TYPES.pop(json_type, None)
+    _JSON_TYPES[json_type] = converter
+    _json_converters.clear()
+
+
+def _json_default(value):
+    """Convert a value json does not support, according to the registered types
+    """
+    converter = _json_converters.get(type(value))
+    if converter is None:
+        # closest registered parent class first (e.g. datetime before date), then abstract base classes
+        json_type = next((json_type for json_type in type(value).__mro__ if json_type in _JSON_TYPES),
+                         None)
+        if json_type is None:
+            json_type = next((json_type for json_type in reversed(_JSON_TYPES) if isinstance(value, json_type)),
+                             None)
+        converter = _json_converters[type(value)] = _JSON_TYPES.get(json_type, _not_json_serializable)
+    return converter(value)
+
+
+def _json_encoder(indent = 4):
+    """Get a json encoder supporting registered types (see register_json_type())
+    Without indent, encoding is compact & done by the C accelerated encoder (which does not support indent).
+    """
+    if indent is None:
+        return json.JSONEncoder(default = _json_default, separators = (',', ':'))
+    return json.JSONEncoder(default = _json_default, indent = indent)
+
+
+# values the C encoder encodes as they are
+_JSON_SCALARS = (str, int, float, bool, type(None))
+# C encoder writing container items one per line - None if the C accelerated json module is not available
+# markers are not given: circular references raise RecursionError, not ValueError
+_json_lines_encoder = c_make_encoder and c_make_encoder(None, _json_default, encode_basestring_ascii, None,
+                                                        ': ', ',\n', False, False, True)
+
+
+def _encode_indented(value, indent, write, level = 0):
+    """Encode a value as indented json, same text as _json_encoder(indent) but mostly encoded by the C encoder:
+    containers of scalars only (e.g. table rows) are encoded at once, one item per line, then indented
+    by replacing new lines (json escapes them in strings), others item by item.
+
+    @args:
+        value:      value to encode
+        indent:     number of spaces per level
+        write:      function called with lists of encoded chunks (e.g. file writelines())
+        level:      indentation level of value
+    """
+    if _json_lines_encoder is None:
+        text = _json_encoder(indent).encode(value)
+        write([text.replace('\n', '\n' + ' ' * (indent * level))])
+        return
+    scalar_types = set(_JSON_SCALARS)
+    newlines = ['\n' + ' ' * (indent * i) for i in range(level + 2)]
+    chunks = []
+
+    def flush():
+        if len(chunks) > 1 << 12:
+            write(chunks)
+            chunks.clear()
+
+    def encode_container(value, level):
+        if level + 1 == len(newlines):
+            newlines.append('\n' + ' ' * (indent * (level + 1)))
+        inner, outer = newlines[level + 1], newlines[level]
+        is_dict = isinstance(value, dict)
+        if all(map(scalar_types.__contains__, map(type, value.values() if is_dict else value))):
+            text = ''.join(_json_lines_encoder(value, 0))
+            if value:
+                text = text[0] + inner + text[1:-1].replace('\n', inner) + outer + text[-1]
+            chunks.append(text)
+            return
+        if not is_dict:
+            chunks.append('[')
+            for i, item in enumerate(value):
+                chunks.append(inner if i == 0 else ',' + inner)
+                encode(item, level + 1)
+                flush()
+            chunks.append(outer + ']')
+            return
+        chunks.append('{')
+        for i, (key, item) in enumerate(value.items()):
+            # json only supports string keys, encode the others the same way json.dump does
+            if not isinstance(key, str):
+                if not isinstance(key, _JSON_SCALARS):
+                    raise TypeError(f'keys must be str, int, float, bool or None, not {type(key).__name__}')
+                key = ''.join(_json_lines_encoder(key, 0))
+            chunks.append((inner if i == 0 else ',' + inner) + encode_basestring_ascii(key) + ': ')
+            encode(item, level + 1)
+            flush()
+        chunks.append(outer + '}')
+
+    def encode(value, level):
+        while not isinstance(value, (dict, list, tuple)):
+            if isinstance(value, _JSON_SCALARS):
+                chunks.append(''.join(_json_lines_encoder(value, 0)))
+                return
+            value = _json_default(value)
+        encode_container(value, level)
+
+    encode(value, level)
+    write(chunks)
+
+
+def _dump_json(output, file_ptr, indent = 4):
+    """Encode a dictionary in a file
+    """
+    if indent is None:
+        # C encoder is only used when encoding at once
+        file_ptr.write(_json_encoder(indent).encode(output))
+    else:
+        _encode_indented(output, indent, file_ptr.writelines)
+
+
+def _append_journal(filename, entry):
+    """Append an entry to the journal of a json file - see _iter_journal()
+
+    @returns: journal size
+    """
+    entry = _json_encoder(indent = None).encode(entry)
+    with open_preserve(_journal_file(filename), 'a', encoding="utf-8", preserve = False) as file_ptr:
+        # one line per entry, written at once
+        file_ptr.write(entry + '\n')
+        return file_ptr.tell()
+
+
+def _json_lines(rows):
+    """Encode values as json lines, compact
+    """
+    if isinstance(rows, Mapping):
+        raise vbrExceptions.OtherException('A json lines file holds a list of values (e.g. table rows), not',
+                                           type(rows).__name__)
+    encoder = _json_encoder(indent = None)
+    return (encoder.encode(row) + '\n' for row in rows)
+
+
+def _append_json_lines(filename, rows):
+    """Append values to a json lines file, one per line
+    """
+    with open(filename, 'ab') as file_ptr:
+        size = file_ptr.tell()
+        if size > 0:
+            with open(filename, 'rb') as read_ptr:
+                read_ptr.seek(-1, os.SEEK_END)
+                if read_ptr.read(1) != b'\n':
+                    # last line has no end: end it if complete, drop what an interrupted append left otherwise
+                    line_start = size
+                    while line_start > 0:
+                        read_ptr.seek(max(line_start - (1 << 16), 0))
+                        chunk = read_ptr.read(line_start - read_ptr.tell())
+                        newline = chunk.rfind(b'\n')
+                        line_start -= len(chunk)
+                        if newline >= 0:
+                            line_start += newline + 1
+                            break
+                    read_ptr.seek(line_start)
+                    try:
+                        json.loads(read_ptr.read())
+                        file_ptr.write(b'\n')
+                    except ValueError:
+                        file_ptr.truncate(line_start)
+        file_ptr.writelines(line.encode('utf-8') for line in _json_lines(rows))
+
+
+def _spool_dir(filename):
+    """Get the spool directory of a json file: {filename}.spool
+    """
+    filename = Path(filename)
+    return filename.with_name(filename.name + '.spool')
+
+
+def _spool_entry(filename, entry):
+    """Write an entry in the spool of a json file, where it waits to be merged in the file (see _commit_spool())
+    Entry files are named after their creation time, so that they are merged in order
+
+    @returns: entry file
+    """
+    spool_dir = _spool_dir(filename)
+    spool_dir.mkdir(parents = True, exist_ok = True)
+    file_id, temp_name = tempfile.mkstemp(dir = spool_dir, prefix = f'{time_ns():020d}-', suffix = '.tmp')
+    try:
+        with os.fdopen(file_id, 'wb') as file_ptr:
+            pickle.dump(entry, file_ptr, protocol = pickle.HIGHEST_PROTOCOL)
+    except BaseException:
+        os.unlink(temp_name)
+        raise
+    # never a partially written entry
+    entry_file = Path(temp_name).with_suffix('.entry')
+    os.replace(temp_name, entry_file)
+    return entry_file
+
+
+def _commit_spool(filename, entry_file, indent, preserve, snapshot):
+    """Merge all the entries waiting in the spool of a json file in the file, in a single rewrite (group commit)
+    File lock must be held (see lock_file()). Nothing is done if entry_file was already merged by another appender.
+    Entries raising a merge conflict are not merged, their error being reported to their appender.
+    """
+    error_file = entry_file.with_suffix('.error')
+    if not entry_file.exists():
+        if error_file.exists():
+            with open(error_file, 'rb') as file_ptr:
+                error = pickle.load(file_ptr)
+            error_file.unlink()
+            raise vbrExceptions.OtherException(*error)
+        return
+
+    entry_files = sorted(_spool_dir(filename).glob('*.entry'))
+
+    def read_entries():
+        entries = []
+        for spooled_file in entry_files:
+            with open(spooled_file, 'rb') as file_ptr:
+                entries.append(pickle.load(file_ptr))
+        return entries
+
+    entries = read_entries()
+    errors = {}
+    json_data = load_json_file(filename, key_as_int=True)
+    try:
+        # consecutive entries with same options are merged in one traversal
+        for options, group in groupby(entries, key = lambda entry: entry['options']):
+            json_data = merge_many([json_data] + [entry['data'] for entry in group], **options)
+    except vbrExceptions.OtherException:
+        # merge entries one by one, to find the conflicting ones - from file content & entries as spooled,
+        # the group merge having modified them in place
+        json_data = load_json_file(filename, key_as_int=True)
+        for spooled_file, entry in zip(entry_files, read_entries()):
+            try:
+                json_data = merge_dict(json_data, entry['data'], **{**entry['options'], 'copy_on_write': True})
+            except vbrExceptions.OtherException as exc:
+                errors[spooled_file] = exc
+
+    with _replaced_file(filename, preserve) as file_ptr:
+        _dump_json(json_data, file_ptr, indent = indent)
+    _drop_journal(filename, preserve)
+    for spooled_file in entry_files:
+        if spooled_file in errors and spooled_file != entry_file:
+            with open(spooled_file.with_suffix('.error'), 'wb') as file_ptr:
+                pickle.dump(errors[spooled_file].args, file_ptr, protocol = pickle.HIGHEST_PROTOCOL)
+        spooled_file.unlink()
+    if snapshot:
+        _save_snapshot(filename)
+    if entry_file in errors:
+        raise errors[entry_file]
+
+
+def append_json_file(filename, new_data, indent = 4, preserve=True,
+                     journal = False, compact_size = None, snapshot = False, lock = False, **kwargs):
+    """Append a json dictionary to an existing json file
+    recurse in all keys.
+    Supports empty file
+    Supports input date containing Sets (transformed as Lists)
+
+    @args:
+        filename:       file where to store content
+        new_data:       content to put in file - dictionary or FlatDict
+        indent:         formating of json file - None for compact json (faster)
+        preserve:       if True and if {output_file_base}.json exists
+                        rename existing by adding timestamp to it
+                        in journal mode, only applies when journal is compacted
+        journal:        if True, new content is appended to the journal of the file ({filename}.journal)
+                        instead of being merged in the file: cost only depends on new content size.
+                        Journal is merged when loading the file (load_json_file()),
+                        so are merge conflicts raised. Conflict strategies functions are not supported.
+        compact_size:   in journal mode, journal size (bytes) from which it is merged into the file
+                        (see compact_json_file()) - None to never merge it
+        snapshot:       if True, save a binary snapshot of the file - see save_json_file()
+                        in journal mode, an existing snapshot is kept: entries appended since are read from the journal
+        lock:           if True, safe when several processes (or threads) append to the same file: file is locked
+                        ({filename}.lock - see misctools.lock_file()) and written in a temporary file renamed
+                        as the file, so that readers never see it partially written.
+                        New content is first written in the spool of the file ({filename}.spool), then the first
+                        appender getting the lock merges all the spooled content in a single rewrite (group commit):
+                        appenders waiting for the lock usually find their content already merged.
+                        indent, preserve & snapshot of the appender writing the file apply.
+                        new_data & dictools.merge_dict() keyword arguments must be picklable.
+
+    @keyword_args:
+        All Optional keyword arguments that dictools.merge_dict() takes.
+
+    A json lines file (.jsonl) is appended new_data values (e.g. table rows), one per line, without reading
+    the file: no merge, no journal, no snapshot, cost only depends on new content size.
+    """
+    if lock:
+        if journal or _is_json_lines(filename):
+            # no rewrite: appends only need to be serialized
+            with lock_file(filename):
+                append_json_file(filename, new_data, indent = indent, preserve = preserve, journal = journal,
+                                 compact_size = compact_size, snapshot = snapshot, **kwargs)
+            return
+        entry_file = _spool_entry(filename, {'options': kwargs, 'data': new_data})
+        with lock_file(filename):
+            try:
+                _commit_spool(filename, entry_file, indent, preserve, snapshot)
+            except BaseException:
+                # content of a failed append must not be merged by next appender
+                entry_file.unlink(missing_ok = True)
+                raise
+        return
+
+    if _is_json_lines(filename):
+        _append_json_lines(filename, new_data)
+        return
+
+    if journal:
+        if kwargs.get('strategies'):
+            raise vbrExceptions.OtherException('Conflict strategies cannot be saved in journal:',
+                                               kwargs['strategies'])
+        journal_size = _append_journal(filename, {'options': kwargs, 'data': new_data})
+        if compact_size is not None and journal_size >= compact_size:
+            compact_json_file(filename, indent = indent, preserve = preserve, snapshot = snapshot)
+        elif snapshot and _read_snapshot(filename, header_only = True) is None:
+            _save_snapshot(filename)
+        return
+
+    old_data = load_json_file(filename, key_as_int=True)
+
+    old_data = merge_dict(old_data, new_data, **kwargs)
+    with _replaced_file(filename, preserve) as file_ptr:
+        _dump_json(old_data, file_ptr, indent = indent)
+    _drop_journal(filename, preserve)
+    if snapshot:
+        _save_snapshot(filename)
+
+
+def save_json_file(output, output_file, preserve = True, indent = 4, patch = False, snapshot = False):
+    ''' Dump a dictionary in a json file.
+    If requested, keep existing file (renamed with timestamp).
+    Supports input date containing Sets (transformed as Lists)
+    and other types registered with register_json_type()
+
+    @args:
+        output:         dictionary to save
+        output_file:    path of the file, with extension
+        preserve:       if True and if {output_file_base}.json exists
+                        rename existing by adding timestamp to it
+        indent:         formating of json file - None for compact json (faster)
+        patch:          if True and file exists, only the differences with its content are written,
+                        as a patch (see dictools.diff_dict()) appended to the journal of the file
+                        (see append_json_file()).
+                        Existing file is kept as is, preserve not applying.
+        snapshot:       if True, also save a binary snapshot of the file ({output_file}.snapshot): its content as
+                        loaded by load_json_file() (file being parsed once, when saved), marshalled so that
+                        load_json_file() reloads it several times faster, as long as file is unchanged.
+                        Otherwise, an existing snapshot is removed when file is overwritten.
+                        Snapshot only holds plain values: reading it cannot build objects nor run code.
+
+    A json lines file (.jsonl) is written output values (e.g. table rows, from a list or an iterator),
+    one per line, compact: indent, patch & snapshot do not apply.
+    '''
+    if _is_json_lines(output_file):
+        with _replaced_file(output_file, preserve) as file_ptr:
+            file_ptr.writelines(_json_lines(output))
+        return
+
+    if patch and (Path(output_file).exists() or _journal_file(output_file).exists()):
+        # compared as saved: registered types encoded, keys converted as loaded
+        output = json.loads(_json_encoder(indent = None).encode(output), object_hook = _keys_hook(True))
+        changes = diff_dict(load_json_file(output_file, key_as_int=True), output, list_conflict = 'a')
+        if changes:
+            _append_journal(output_file, {'options': {'list_conflict': 'a'},
+                                          'patch': [[op, [_json_key(key) for key in path], *value]
+                                                    for op, path, *value in changes]})
+        if snapshot and _read_snapshot(output_file, header_only = True) is None:
+            _save_snapshot(output_file)
+        return
+
+    # create output file, handling overwriting exising one
+    with _replaced_file(output_file, preserve) as file_ptr:
+        _dump_json(output, file_ptr, indent = indent)
+    _drop_journal(output_file, preserve)
+    if snapshot:
+        _save_snapshot(output_file)
+
+
+def _iter_json_stream(output, indent = 4):
+    ''' Encode a dictionary as json chunks, writing list, tuple & iterator values item by item.
+    Produces the same text as save_json_file(output, indent = indent)
+    '''
+    encoder = _json_encoder(indent)
+    key_separator = ':' if indent is None else ': '
+
+    def newline(level):
+        return '' if indent is None else '\n' + ' ' * (indent * level)
+
+    def encode(obj, level):
+        if indent is None:
+            return encoder.encode(obj)
+        chunks = []
+        _encode_indented(obj, indent, chunks.extend, level)
+        return ''.join(chunks)
+
+    if not output:
+        yield '{}'
+        return
+
+    for i, (key, value) in enumerate(output.items()):
+        # json only supports string keys, encode the others the same way json.dump does
+        key = key if isinstance(key, str) else json.dumps(key)
+        yield ('{' if i == 0 else ',') + newline(1) + json.dumps(key) + key_separator
+
+        if not isinstance(value, (Sequence, Iterator)) or isinstance(value, (str, bytes, bytearray, memoryview)):
+            yield encode(value, 1)
+            continue
+
+        empty = True
+        for item in value:
+            yield ('[' if empty else ',') + newline(2) + encode(item, 2)
+            empty = False
+        yield '[]' if empty else newline(1) + ']'
+    yield newline(0) + '}'
+
+
+def save_json_stream(output, output_file, preserve = True, indent = 4, snapshot = False):
+    ''' Dump a dictionary in a json file, writing its list & iterator values item by item.
+    Same output as save_json_file, but values can be generators (e.g. rows still being read),
+    so the whole content never needs to be in memory.
+    If requested, keep existing file (renamed with timestamp).
+
+    @args:
+        output:         dictionary to save
+        output_file:    path of the file, with extension
+        preserve:       if True and if {output_file_base}.json exists
+                        rename existing by adding timestamp to it
+        indent:         formating of json file - None for compact json (faster)
+        snapshot:       if True, also save a binary snapshot of the file - see save_json_file()
+    '''
+    # rows may be read while written: file is only replaced once all are
+    with _replaced_file(output_file, preserve) as file_ptr:
+        file_ptr.writelines(_iter_json_stream(output, indent = indent))
+    _drop_journal(output_file, preserve)
+    if snapshot:
+        _save_snapshot(output_file)
+
+if __name__ == '__main__':
+    raise vbrExceptions.OtherException('This module should not be called directly.')
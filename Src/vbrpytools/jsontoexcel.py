@@ -0,0 +1,218 @@
+''' Open a json file and save its tables in an excel file - reverse of exceltojson
+
+column names based on json structure
+    - dictionary structure is indicated by dot '.'
+    - list values are semicolon ";" separated multi-value data, in a column name under braket "[...]"
+      (a list of one number being written as this number)
+    - keys starting with hash '#' are kept, so ignored by exceltojson
+    - strings in iso format of datetime & time (as written by exceltojson) are written as such
+'''
+
+import re
+from collections.abc import Iterator, Mapping
+from datetime import datetime, time
+from itertools import chain, islice
+from warnings import catch_warnings, simplefilter
+
+from openpyxl import Workbook
+from openpyxl.utils.cell import get_column_letter
+from openpyxl.worksheet.table import Table, TableColumn
+
+from vbrpytools import exceptions as vbrExceptions
+from vbrpytools.dicjsontools import LazyJsonFile, rows_from_columns
+from vbrpytools.misctools import get_args, force_stdout_encoding, open_preserve
+
+
+_ISO_DATETIME = re.compile(r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?')
+_ISO_TIME = re.compile(r'\d{2}:\d{2}:\d{2}(\.\d+)?')
+
+
+def _cell_value(value):
+    ''' Get the excel value of a json value, iso formatted datetime & time being converted
+    '''
+    if isinstance(value, str):
+        if _ISO_DATETIME.fullmatch(value):
+            return datetime.fromisoformat(value)
+        if _ISO_TIME.fullmatch(value):
+            return time.fromisoformat(value)
+    return value
+
+
+def _iter_cells(row, nested = True, keys = ()):
+    ''' Iterate over the cells of a row dictionary
+    Args:
+        row (dict): row dictionary, as created by exceltojson
+        nested (bool): if True, nested dictionaries are flattened in dotted column names
+    Returns:
+        generator of tuple (column name, cell value)
+    '''
+    for key, value in row.items():
+        path = keys + (str(key),)
+        if isinstance(value, Mapping):
+            if not nested:
+                raise vbrExceptions.OtherException('Cannot write nested value at', '.'.join(path))
+            yield from _iter_cells(value, nested, path)
+        elif isinstance(value, (list, tuple, set)):
+            if not value:
+                continue
+            if any(isinstance(item, (Mapping, list, tuple, set)) for item in value):
+                raise vbrExceptions.OtherException('Cannot write multi-value containing structure at',
+                                                   '.'.join(path))
+            item = next(iter(value))
+            if len(value) == 1 and isinstance(item, (int, float)) and not isinstance(item, bool):
+                # number cell, read back by exceltojson as a one item list of this number
+                yield '[' + '.'.join(path) + ']', item
+            else:
+                yield '[' + '.'.join(path) + ']', ';'.join(str(item) for item in value)
+        elif value is not None:
+            yield '.'.join(path), _cell_value(value)
+
+
+def table_header(rows, nested = True):
+    ''' Get the column names needed to write table rows.
+        Column order is kept: a column missing from first rows is inserted after the column preceding it
+        in the row it first appears in.
+    Args:
+        rows (iterable of dict): rows of the table
+        nested (bool): if True, nested dictionaries are flattened in dotted column names
+    Returns:
+        list of str
+    '''
+    header = []
+    positions = {}      # {column name: index in header}
+    for row in rows:
+        position = 0
+        for name, _ in _iter_cells(row, nested):
+            index = positions.get(name)
+            if index is None:
+                # new column: following ones are shifted
+                header.insert(position, name)
+                positions = {column: col for col, column in enumerate(header)}
+                index = position
+            position = index + 1
+    return header
+
+
+class ExcelWriter():
+    ''' Class to write tables in an excel file, in streaming mode:
+        rows are written one by one, memory staying constant whatever the number of rows
+    '''
+    def __init__(self, filename, preserve = True):
+        ''' Create the excel workbook
+        Args:
+            filename (str): excel file
+            preserve (bool): if True and file exists, rename existing by adding timestamp to it
+        '''
+        self._filename = filename
+        self._preserve = preserve
+        self._wb = Workbook(write_only = True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.save()
+
+    def save(self):
+        ''' Save the excel file
+        '''
+        with open_preserve(self._filename, 'wb', encoding = None, preserve = self._preserve) as file_ptr:
+            self._wb.save(file_ptr)
+
+    def write_table(self, table_name, rows, header = None, nested = True, sample_rows = 1000):
+        ''' Write rows in a new sheet, as an excel table
+        Args:
+            table_name (str): name of the table (and of its sheet)
+            rows: iterable of dict - rows of the table
+                  or dict - columnar table {column: [value of each row]} (see dicjsontools.columns_from_rows())
+            header (list of str): column names - None to get them from rows:
+                                  all rows if rows can be read twice (e.g. list),
+                                  the first sample_rows rows otherwise
+            nested (bool): if True, nested dictionaries are flattened in dotted column names
+            sample_rows (int): number of rows read to get the header from an iterator
+        Returns:
+            int: number of written rows
+        '''
+        if isinstance(rows, Mapping):
+            rows = rows_from_columns(rows)
+        if header is None:
+            if isinstance(rows, Iterator):
+                sample = list(islice(rows, sample_rows))
+                header = table_header(sample, nested)
+                rows = chain(sample, rows)
+            else:
+                header = table_header(rows, nested)
+        if not header:
+            raise vbrExceptions.OtherException('No column to write in table', table_name)
+
+        column_ids = {name: col for col, name in enumerate(header)}
+        ws = self._wb.create_sheet(title = table_name[:31])
+        ws.append(header)
+        row_count = 0
+        for row in rows:
+            cells = [None] * len(header)
+            for name, value in _iter_cells(row, nested):
+                col = column_ids.get(name)
+                if col is None:
+                    raise vbrExceptions.OtherException('Column not in header:', name, 'in table', table_name)
+                cells[col] = value
+            ws.append(cells)
+            row_count += 1
+
+        # a table needs at least one row below its header
+        table = Table(displayName = table_name,
+                      ref = f'A1:{get_column_letter(len(header))}{max(row_count, 1) + 1}')
+        # write only sheets have no cell to read the column names from: they are set here
+        table.tableColumns = [TableColumn(id = col + 1, name = name) for col, name in enumerate(header)]
+        with catch_warnings():
+            simplefilter('ignore', UserWarning)
+            ws.add_table(table)
+        return row_count
+
+
+def save_excel_file(tables, filename, preserve = True, **kwargs):
+    ''' Write tables in an excel file, each one in its own sheet
+    Args:
+        tables (dict): {table name: rows}, e.g. output of exceltojson
+        filename (str): excel file
+        preserve (bool): if True and file exists, rename existing by adding timestamp to it
+    Keyword Args:
+        All Optional keyword arguments that ExcelWriter.write_table() takes
+    '''
+    with ExcelWriter(filename, preserve = preserve) as writer:
+        for table_name, rows in tables.items():
+            writer.write_table(table_name, rows, **kwargs)
+
+
+def _main():
+    ''' Entry point of this module
+    '''
+    force_stdout_encoding()
+    args_def = [(['-f', '--inputfile'     ], {'action':'store',                       'required':True , 'help':'Input Filename (json), as created by exceltojson',             'metavar':'xxx.json'}),
+                (['-t', '--inputtable'    ], {'action':'store',      'default':None,  'required':False, 'help':'list of comma separated table names - default: all',           'metavar':'xxx,yyy' }),
+                (['-o', '--outputfile'    ], {'action':'store',                       'required':True , 'help':'Output Filename (xlsx)',                                       'metavar':'xxx.xlsx'}),
+                (['-p', '--preserve'      ], {'action':'store_true', 'default':False, 'required':False, 'help':'if set and output file exists, rename it by adding timestamp'                      }),
+               ]
+    args = get_args(args_def)
+
+    with LazyJsonFile(args.inputfile) as json_file, ExcelWriter(args.outputfile, preserve = args.preserve) as writer:
+        # json file is read table by table, row by row when possible, so that it is never fully loaded
+        tables = json_file.get() if json_file.has_journal else None
+        table_names = args.inputtable.split(',') if args.inputtable else list(json_file.keys() if tables is None else tables)
+        for table_name in table_names:
+            if tables is not None:
+                rows = tables.get(table_name)
+            elif json_file.is_array([table_name]):
+                # read twice: once for the header, then to write rows
+                header = table_header(json_file.values([table_name]))
+                writer.write_table(table_name, json_file.values([table_name]), header = header)
+                continue
+            else:
+                rows = json_file.get([table_name])
+            if rows is None:
+                raise vbrExceptions.OtherException('Table not found:', table_name)
+            writer.write_table(table_name, rows)
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,429 @@
+"""
+support library to read json files lazily - see dicjsontools
+- values located in the file & decoded on demand, without loading the whole file
+"""
+
+import json
+import mmap
+import os
+import re
+from itertools import accumulate
+
+from vbrpytools import exceptions as vbrExceptions
+from vbrpytools.dictools import _compile_query, _iter_query, _key_converter, _keys_hook, _project_query
+from vbrpytools.dictools import apply_patch, merge_dict
+from vbrpytools.jsonstore import _iter_journal, _journal_file
+
+
+
+_JSON_SPACE = re.compile(rb'[ \t\n\r]*')
+_JSON_STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"')
+_JSON_STRING_END = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*"')
+_JSON_SCALAR = re.compile(rb'[^,\]} \t\n\r]*')
+# containers are skipped chunk by chunk: escape sequences & then all but structural characters removed
+# (in C), strings then removed, leaving only brackets to count
+_JSON_ESCAPE = re.compile(rb'\\.', re.DOTALL)
+_JSON_NOT_STRUCTURE = bytes(char for char in range(256) if char not in b'"[]{}')
+_JSON_STRUCTURE_STRINGS = re.compile(rb'"[^"]*"')
+_JSON_BRACKET_DEPTH = {ord('{'): 1, ord('['): 1, ord('}'): -1, ord(']'): -1}
+_JSON_NOT_BRACKETS = re.compile(rb'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*')
+
+
+def _scan_json_container_end(buffer, pos, depth, end):
+    """Get the end position of a container by scanning brackets one by one, from depth at pos
+    """
+    while pos < end:
+        pos = _JSON_NOT_BRACKETS.match(buffer, pos, end).end()
+        char = buffer[pos:pos + 1]
+        if char in (b'{', b'['):
+            depth += 1
+        elif char:
+            depth -= 1
+            if depth == 0:
+                return pos + 1
+        pos += 1
+    raise vbrExceptions.OtherException('Unexpected end of json content')
+
+
+def _skip_json_value(buffer, pos, max_chunk_size = 1 << 20):
+    """Get the end position of the json value starting at pos, without decoding it
+    Containers are read by chunks, doubling in size up to max_chunk_size, so that small ones are fast to skip
+    """
+    first = buffer[pos:pos + 1]
+    if first == b'"':
+        return _JSON_STRING.match(buffer, pos).end()
+    if first not in (b'{', b'['):
+        return _JSON_SCALAR.match(buffer, pos).end()
+
+    depth = 1
+    pos += 1
+    in_string = False
+    size = len(buffer)
+    chunk_size = 256
+    while pos < size:
+        chunk_size = min(chunk_size * 2, max_chunk_size)
+        end = min(pos + chunk_size, size)
+        # do not split an escape sequence
+        while end < size and buffer[end - 1:end] == b'\\':
+            end += 1
+        chunk = buffer[pos:end]
+        if b'\\' in chunk:
+            chunk = _JSON_ESCAPE.sub(b'', chunk)
+        structure = chunk.translate(None, _JSON_NOT_STRUCTURE)
+        string_start = in_string
+        if in_string:
+            quote = structure.find(b'"')
+            if quote < 0:
+                pos = end
+                continue
+            structure = structure[quote + 1:]
+            in_string = False
+        brackets = _JSON_STRUCTURE_STRINGS.sub(b'', structure)
+        quote = brackets.find(b'"')
+        if quote >= 0:
+            brackets = brackets[:quote]
+            in_string = True
+        depths = list(accumulate(map(_JSON_BRACKET_DEPTH.__getitem__, brackets), initial = depth))
+        if min(depths) <= 0:
+            # container ends in this chunk
+            if string_start:
+                pos = _JSON_STRING_END.match(buffer, pos).end()
+            return _scan_json_container_end(buffer, pos, depth, end)
+        depth = depths[-1]
+        pos = end
+    raise vbrExceptions.OtherException('Unexpected end of json content')
+
+
+def _decode_json_value(buffer, pos, decoder):
+    """Decode the json value starting at pos, reading the buffer by growing chunks
+
+    @returns: tuple (value, value end position)
+    """
+    size = 512
+    while True:
+        chunk = buffer[pos:pos + size]
+        # a multi bytes character cut at chunk end is dropped: value is then incomplete
+        text = chunk.decode('utf-8', errors = 'ignore')
+        complete = pos + size >= len(buffer)
+        try:
+            value, end = decoder.raw_decode(text)
+            # a number may also be cut at chunk end
+            if end < len(text) or complete:
+                return value, pos + (end if len(text) == len(chunk) else len(text[:end].encode('utf-8')))
+        except json.JSONDecodeError:
+            if complete:
+                raise
+        size *= 2
+
+
+def _iter_json_members(buffer, pos, decoder = None):
+    """Iterate over the members of the json object or array starting at pos, without decoding them
+    (or decoding them with decoder, if given - faster than locating then decoding them)
+
+    @returns: generator of tuple (key - None for array items -, value start position, None)
+              or (key, decoded value, value end position) if decoder is given
+              value end is only located if iteration goes on, so that a value can be entered without being skipped
+    """
+    container = buffer[pos:pos + 1]
+    if container not in (b'{', b'['):
+        raise vbrExceptions.OtherException('Not a json object or array at position', pos)
+    pos = _JSON_SPACE.match(buffer, pos + 1).end()
+    if buffer[pos:pos + 1] in (b'}', b']'):
+        return
+    while True:
+        key = None
+        if container == b'{':
+            key_end = _JSON_STRING.match(buffer, pos).end()
+            key = buffer[pos + 1:key_end - 1]
+            key = json.loads(buffer[pos:key_end]) if b'\\' in key else key.decode('utf-8')
+            # skip ':'
+            pos = _JSON_SPACE.match(buffer, _JSON_SPACE.match(buffer, key_end).end() + 1).end()
+        if decoder is None:
+            yield key, pos, None
+            end = _skip_json_value(buffer, pos)
+        else:
+            value, end = _decode_json_value(buffer, pos, decoder)
+            yield key, value, end
+        pos = _JSON_SPACE.match(buffer, end).end()
+        if buffer[pos:pos + 1] != b',':
+            return
+        pos = _JSON_SPACE.match(buffer, pos + 1).end()
+
+
+def _sub_value(value, keys):
+    """Get the value at a key path (array items being identified by their index) of a value
+
+    @returns: tuple (value, True if there is a value at key path)
+    """
+    for key in keys:
+        if isinstance(value, dict) and key in value:
+            value = value[key]
+        elif isinstance(value, list) and isinstance(key, int) and 0 <= key < len(value):
+            value = value[key]
+        else:
+            return None, False
+    return value, True
+
+
+def _patch_value(keys, value, found, patch, options):
+    """Apply a patch (see dictools.apply_patch()) to the value at a key path, e.g. read by LazyJsonFile.get()
+
+    @returns: tuple (patched value, True if there is a value at key path)
+    """
+    depth = len(keys)
+    for op, path, *op_value in patch:
+        if len(path) > depth:
+            if path[:depth] == keys:
+                # operation inside the value, applied to the value wrapped under key None
+                value = apply_patch({None: value} if found else {}, [[op, [None, *path[depth:]], *op_value]],
+                                    **options)[None]
+        elif path == keys[:len(path)]:
+            # operation on the value or one of its parents
+            if op == 'remove':
+                value, found = None, False
+            elif op == 'extend' and len(path) == depth:
+                value = apply_patch({None: value} if found else {}, [[op, [None], *op_value]], **options)[None]
+            elif op == 'extend':
+                # keys are applied to the whole list value (see LazyJsonFile.get()): no list among parents
+                raise vbrExceptions.OtherException('Patch does not apply, cannot extend at',
+                                                   '.'.join(str(key) for key in path))
+            else:
+                value, found = _sub_value(op_value[0], keys[len(path):])
+    return value, found
+
+
+class LazyJsonFile():
+    """Read parts of a json file without loading it: file is memory mapped and scanned on demand,
+    only requested values being decoded. Memory needed is the one of the requested values.
+    Keys are converted as jsonstore.load_json_file() does.
+
+    Path of a value is a dotted string of keys ('table.12.name') or a list of keys, array items being
+    identified by their index. Empty path (None) is the whole content.
+    """
+    def __init__(self, filename, key_as_int=True):
+        """Open the json file
+
+        @args:
+            filename:       json file
+            key_as_int:     key conversion policy - see jsonstore.load_json_file()
+        """
+        self._filename = filename
+        self._key_as_int = key_as_int
+        self._decoder = json.JSONDecoder(object_hook = _keys_hook(key_as_int))
+        self._convert_key = _key_converter(key_as_int)
+        self.has_journal = _journal_file(filename).exists()
+        with open(filename, 'rb') as file_ptr:
+            if os.fstat(file_ptr.fileno()).st_size == 0:
+                self._buffer = b'{}'
+            else:
+                self._buffer = mmap.mmap(file_ptr.fileno(), 0, access = mmap.ACCESS_READ)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Release the memory mapped file
+        """
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+    def _keys(self, path):
+        if path is None:
+            return []
+        keys = path.split('.') if isinstance(path, str) else list(path)
+        return [self._convert_key(key) for key in keys]
+
+    def _locate(self, keys):
+        """Get the position of the value at a key path
+
+        @returns: start position of the value - None if there is no value at this path
+        """
+        start = _JSON_SPACE.match(self._buffer).end()
+        for key in keys:
+            if self._buffer[start:start + 1] not in (b'{', b'['):
+                return None
+            for index, (member_key, member_start, _) in enumerate(_iter_json_members(self._buffer, start)):
+                if (key == index if member_key is None else key == self._convert_key(member_key)):
+                    start = member_start
+                    break
+            else:
+                return None
+        return start
+
+    def _decode(self, start):
+        end = _skip_json_value(self._buffer, start)
+        return self._decoder.decode(self._buffer[start:end].decode('utf-8'))
+
+    def _members(self, path, decode = False):
+        if self.has_journal:
+            raise vbrExceptions.OtherException('Cannot iterate over a json file with journal:', self._filename,
+                                               '(see compact_json_file())')
+        keys = self._keys(path)
+        start = self._locate(keys)
+        if start is None:
+            raise KeyError('.'.join(str(key) for key in keys))
+        return _iter_json_members(self._buffer, start, self._decoder if decode else None)
+
+    def get(self, path = None, default = None):
+        """Get the value at a path
+        Content appended in the journal of the file (see jsonstore.append_json_file()) is merged in the value
+
+        @args:
+            path:           path of the value
+            default:        value returned if there is no value at this path
+        """
+        keys = self._keys(path)
+        if not self.has_journal:
+            start = self._locate(keys)
+            return self._decode(start) if start is not None else default
+
+        # journal entries are applied key by key up to the first list: list items are only known
+        # once the whole list is merged (e.g. items appended by journal)
+        entries = list(_iter_journal(self._filename, self._key_as_int))
+        depth = self._list_depth(keys, entries)
+        keys, sub_keys = keys[:depth], keys[depth:]
+        start = self._locate(keys)
+        value = self._decode(start) if start is not None else None
+        found = start is not None
+        for entry in entries:
+            if 'patch' in entry:
+                value, found = _patch_value(keys, value, found, entry['patch'], entry['options'])
+                continue
+            entry_value = entry['data']
+            for key in keys:
+                if not isinstance(entry_value, dict) or key not in entry_value:
+                    break
+                entry_value = entry_value[key]
+            else:
+                if not found:
+                    value, found = entry_value, True
+                elif keys:
+                    # merge at parent level, so that list values are merged as well
+                    value = merge_dict({keys[-1]: value}, {keys[-1]: entry_value}, **entry['options'])[keys[-1]]
+                else:
+                    value = merge_dict(value, entry_value, **entry['options'])
+        if found and sub_keys:
+            value, found = _sub_value(value, sub_keys)
+        return value if found else default
+
+    def _list_depth(self, keys, entries):
+        """Get the depth of the first list along a key path, in the file or in its journal entries
+        - length of the path if there is none
+        """
+        for depth in range(len(keys)):
+            prefix = keys[:depth]
+            if self.is_array(prefix):
+                return depth
+            for entry in entries:
+                if 'patch' not in entry:
+                    if isinstance(_sub_value(entry['data'], prefix)[0], list):
+                        return depth
+                    continue
+                for op, path, *op_value in entry['patch']:
+                    if op == 'extend' and path == prefix:
+                        return depth
+                    if (op in ('add', 'change') and path == prefix[:len(path)]
+                        and isinstance(_sub_value(op_value[0], prefix[len(path):])[0], list)):
+                        return depth
+        return len(keys)
+
+    def is_array(self, path = None):
+        """Check if the value at a path is an array (False if there is no value at this path)
+        """
+        start = self._locate(self._keys(path))
+        return start is not None and self._buffer[start:start + 1] == b'['
+
+    def keys(self, path = None):
+        """Iterate over the keys of the object at a path
+        """
+        for key, _, _ in self._members(path):
+            yield self._convert_key(key)
+
+    def items(self, path = None):
+        """Iterate over the (key, value) of the object at a path, each value being decoded when reached
+        """
+        for key, value, _ in self._members(path, decode = True):
+            yield self._convert_key(key), value
+
+    def values(self, path = None):
+        """Iterate over the values of the object or the items of the array at a path,
+        each one being decoded when reached
+        """
+        for _, value, _ in self._members(path, decode = True):
+            yield value
+
+    def _query_members(self, start, node):
+        """Iterate over the members of the value at start matching a query node - see dicjsontools.select()
+
+        @returns: generator of tuple (key or index, sub query node, decoded value, None)
+                                  or (key or index, sub query node, None, value start position)
+        """
+        if self._buffer[start:start + 1] not in (b'{', b'['):
+            return
+        if node.any is not None:
+            # all members match (e.g. table rows): decoded one at a time while being scanned
+            for index, (key, value, _) in enumerate(_iter_json_members(self._buffer, start, self._decoder)):
+                key = index if key is None else self._convert_key(key)
+                yield key, node.keys.get(key, node.any), value, None
+            return
+        # scanning stops once all keys are found
+        remaining = len(set(map(id, node.keys.values())))
+        for index, (key, member_start, _) in enumerate(_iter_json_members(self._buffer, start)):
+            key = index if key is None else self._convert_key(key)
+            sub_node = node.keys.get(key)
+            if sub_node is not None:
+                yield key, sub_node, None, member_start
+                remaining -= 1
+                if not remaining:
+                    return
+
+    def _iter_query(self, start, node, path):
+        for key, sub_node, value, member_start in self._query_members(start, node):
+            if member_start is None:
+                yield from ([(path + (key,), value)] if sub_node.end else _iter_query(value, sub_node, path + (key,)))
+            elif sub_node.end:
+                yield path + (key,), self._decode(member_start)
+            else:
+                yield from self._iter_query(member_start, sub_node, path + (key,))
+
+    def _project_query(self, start, node):
+        projection = {}
+        for key, sub_node, value, member_start in self._query_members(start, node):
+            if member_start is None:
+                value = value if sub_node.end else _project_query(value, sub_node)
+            else:
+                value = self._decode(member_start) if sub_node.end else self._project_query(member_start, sub_node)
+            if value is None and not sub_node.end:
+                continue
+            projection[key] = value
+        if not projection:
+            return None
+        return list(projection.values()) if self._buffer[start:start + 1] == b'[' else projection
+
+    def _query_root(self):
+        if self.has_journal:
+            raise vbrExceptions.OtherException('Cannot query a json file with journal:', self._filename,
+                                               '(see compact_json_file())')
+        return _JSON_SPACE.match(self._buffer).end()
+
+    def iter_select(self, *paths):
+        """Iterate over the values matching path queries (see dicjsontools.iter_select()),
+        only the matching values being decoded - members of wildcards are decoded one at a time
+        """
+        yield from self._iter_query(self._query_root(), _compile_query(paths), ())
+
+    def select(self, *paths):
+        """Extract the parts of the file matching path queries (see dicjsontools.select()),
+        only the matching values being decoded - members of wildcards are decoded one at a time
+        """
+        root = self._query_root()
+        projection = self._project_query(root, _compile_query(paths))
+        if projection is None:
+            projection = [] if self._buffer[root:root + 1] == b'[' else {}
+        return projection
+
+if __name__ == '__main__':
+    raise vbrExceptions.OtherException('This module should not be called directly.')
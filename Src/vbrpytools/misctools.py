@@ -20,6 +20,7 @@ import subprocess
 import traceback
 import inspect
 from argparse import ArgumentParser, RawTextHelpFormatter
+from contextlib import contextmanager
 from functools import wraps
 from datetime import datetime
 
@@ -28,7 +29,9 @@ import humanize
 from vbrpytools import exceptions as vbrExceptions
 
 if system() == 'Windows':
-    from msvcrt import getch, kbhit
+    from msvcrt import getch, kbhit, locking, LK_LOCK, LK_UNLCK
+else:
+    from fcntl import flock, LOCK_EX, LOCK_UN
 
 
 # VERBOSE RELATED FUNCTIONS
@@ -386,11 +389,48 @@ def colorize(text: str, color):
 # MISC FUNCTIONS
 # ==============
 def timestamp_filename(file):
-    """ Rename a file by adding a timestamp to its name """
+    """ Rename a file by adding a timestamp to its name
+    A counter is added after the timestamp if the name is already used (file renamed twice in a second)
+    """
     file = Path(file)
     if file.exists():
         # rename existing file by adding timestamp to its name
-        file.rename(file.parent / (file.stem + datetime.now().strftime('_%y-%m-%dT%H.%M.%S') + file.suffix))
+        stamped_name = file.stem + datetime.now().strftime('_%y-%m-%dT%H.%M.%S')
+        stamped_file = file.parent / (stamped_name + file.suffix)
+        count = 1
+        while stamped_file.exists():
+            count += 1
+            stamped_file = file.parent / f'{stamped_name}_{count}{file.suffix}'
+        file.rename(stamped_file)
+
+@contextmanager
+def lock_file(file):
+    """ Lock a file for the duration of a with block, other processes & threads locking it waiting until released
+    Lock is taken on a lock file {file}.lock (created if needed, never removed),
+    with fcntl.flock on posix systems, msvcrt.locking on windows
+    """
+    file = Path(file)
+    file.parent.mkdir(parents = True, exist_ok = True)
+    with open(file.with_name(file.name + '.lock'), 'a+b') as lock_ptr:
+        if system() == 'Windows':
+            lock_ptr.seek(0)
+            while True:
+                try:
+                    # retries for 10s before raising
+                    locking(lock_ptr.fileno(), LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        else:
+            flock(lock_ptr.fileno(), LOCK_EX)
+        try:
+            yield
+        finally:
+            if system() == 'Windows':
+                lock_ptr.seek(0)
+                locking(lock_ptr.fileno(), LK_UNLCK, 1)
+            else:
+                flock(lock_ptr.fileno(), LOCK_UN)
 
 def open_preserve(file, mode, *args, encoding='utf-8', preserve = True, create_path_if_w = True, **kwargs):
     ''' Open a file
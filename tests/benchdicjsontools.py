@@ -0,0 +1,66 @@
+'''
+benchmark dicjsontools functions
+'''
+
+import json
+import sys
+from datetime import datetime, time
+from pathlib import Path
+from timeit import timeit
+from vbrpytools.dicjsontools import save_json_file
+
+
+class _LegacyEncoder(json.JSONEncoder):
+    """json encoder as used before the type registry: isinstance chain for each unsupported value."""
+    def default(self, o):
+        if isinstance(o, set):
+            return list(o)
+        if isinstance(o, datetime):
+            return o.isoformat()
+        if isinstance(o, time):
+            return o.isoformat()
+        return json.JSONEncoder.default(self, o)
+
+
+def _table(nbr_rows):
+    """Create a table as exceltojson does: nested rows, with datetime, time & multi-value values."""
+    return {'table': [{'date': datetime(2024, 1 + r % 12, 1 + r % 28),
+                       'entree': {'categorie': f'categorie {r % 7}', 'nom': f'name {r}', 'detail': 'x' * 40},
+                       'membre': {'id': r, 'roles': {'a', 'b'} if r % 3 == 0 else ['c']},
+                       'compta': {'debit': r * 1.5, 'credit': None},
+                       'time': time(r % 24)}
+                      for r in range(nbr_rows)]}
+
+
+def _main():
+    """Main function to benchmark dicjsontools functions.
+    Number of rows can be given as argument: 1000000 rows create a ~500MB json file.
+    """
+    nbr_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    output = _table(nbr_rows)
+    output_file = Path('tests/outputs/bench.json')
+    output_file.parent.mkdir(parents = True, exist_ok = True)
+
+    def legacy_dump():
+        with open(output_file, 'w', encoding = 'utf-8') as file_ptr:
+            json.dump(output, file_ptr, indent = 4, cls = _LegacyEncoder)
+
+    legacy_dump()
+    legacy_text = output_file.read_text(encoding = 'utf-8')
+    save_json_file(output, output_file, preserve = False)
+    assert output_file.read_text(encoding = 'utf-8') == legacy_text
+    del legacy_text
+
+    nbr = 3
+    legacy = timeit(legacy_dump, number = nbr)
+    indented = timeit(lambda: save_json_file(output, output_file, preserve = False), number = nbr)
+    size = output_file.stat().st_size
+    compact = timeit(lambda: save_json_file(output, output_file, preserve = False, indent = None), number = nbr)
+    print(f'{nbr_rows} rows: {size >> 20}MB indented, {output_file.stat().st_size >> 20}MB compact')
+    print(f'json.dump(indent=4, cls)  : {legacy / nbr:.2f}s')
+    print(f'save_json_file indent=4   : {indented / nbr:.2f}s  (x{legacy / indented:.1f})')
+    print(f'save_json_file indent=None: {compact / nbr:.2f}s  (x{legacy / compact:.1f})')
+
+if __name__ == "__main__":
+    # run the benchmark
+    _main()
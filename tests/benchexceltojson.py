@@ -0,0 +1,60 @@
+'''
+benchmark exceltojson functions
+'''
+
+from timeit import timeit
+from vbrpytools.dicjsontools import merge_dict, create_nested_dict
+from vbrpytools.exceltojson import _RowBuilder #pylint: disable=protected-access #accessed for benchmark purpose only
+
+
+def _legacy_build(column_names, row, nested = True, with_ignored = False):
+    """Row creation as done before the header was compiled: header parsed & merged cell by cell."""
+    output_entry = {}
+    for name, cell_value in zip(column_names, row):
+        if (cell_value is not None) and (cell_value != '') and\
+           ((name[0] != '#') or with_ignored):
+            if name[0] == '[' and name[-1] == ']':
+                multivalue = True
+                name = name[1:-1]
+            else:
+                multivalue = False
+            keys = name.split('.') if nested else [name]
+            if multivalue:
+                if str(cell_value).isnumeric():
+                    cell_value = [cell_value]
+                else:
+                    cell_value = str(cell_value).split(';')
+            output_entry = merge_dict(output_entry, create_nested_dict(keys, cell_value))
+    return output_entry
+
+
+def _wide_table(nbr_groups = 30, nbr_rows = 2000):
+    """Create a wide table: nbr_groups x 4 dotted columns, including ignored & multi-value ones."""
+    column_names = []
+    for g in range(nbr_groups):
+        column_names += [f'group{g}.id', f'group{g}.detail.name', f'[group{g}.tags]', f'#group{g}.note']
+    rows = [tuple(v for g in range(nbr_groups) for v in (r, f'name {r}', 'a;b;c', 'ignored'))
+            for r in range(nbr_rows)]
+    return column_names, rows
+
+
+def _main():
+    """Main function to benchmark exceltojson functions."""
+    column_names, rows = _wide_table()
+
+    def compiled_build():
+        row_builder = _RowBuilder(column_names)
+        return [row_builder.build(row) for row in rows]
+
+    assert [_legacy_build(column_names, row) for row in rows] == compiled_build()
+
+    nbr = 5
+    legacy = timeit(lambda: [_legacy_build(column_names, row) for row in rows], number = nbr)
+    compiled = timeit(compiled_build, number = nbr)
+    print(f'{len(column_names)} columns x {len(rows)} rows')
+    print(f'per-cell header parsing: {legacy / nbr:.3f}s')
+    print(f'compiled header        : {compiled / nbr:.3f}s  (x{legacy / compiled:.1f})')
+
+if __name__ == "__main__":
+    # run the benchmark
+    _main()
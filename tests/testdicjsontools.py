@@ -1,7 +1,175 @@
-''' testing stuff
 '''
-from vbrpytools.dicjsontools import create_nested_dict
+test dicjsontools functions
+'''
 
+import copy
+import json
+import pickle
+import random
+import shutil
+from pathlib import Path
+from vbrpytools import exceptions as vbrExceptions
+from vbrpytools.dicjsontools import LazyJsonFile, append_json_file, create_nested_dict, load_json_file
+from vbrpytools.dicjsontools import save_json_file, save_json_stream, select
+from vbrpytools.jsonstore import _commit_spool, _spool_entry #pylint: disable=protected-access #accessed for test purpose only
+from vbrpytools.jsonstore import _SNAPSHOT_MAGIC, _snapshot_file, _snapshot_states #pylint: disable=protected-access #accessed for test purpose only
+from vbrpytools.misctools import lock_file
 
-if __name__ == "__main__":
+
+def _test_append_lock(output_dir):
+    """Test locked appends: group commit with a conflicting entry, failed append leaving nothing spooled."""
+    filename = output_dir / 'append_lock.json'
+    save_json_file({'y': 2}, filename, preserve = False)
+    # entries spooled by other appenders, then merged by the first one getting the lock
+    _spool_entry(filename, {'options': {'list_conflict': 'a'}, 'data': {'x': {'l': [1]}}})
+    _spool_entry(filename, {'options': {'list_conflict': 'a'}, 'data': {'x': {'l': [2]}}})
+    conflicting = _spool_entry(filename, {'options': {'list_conflict': 'a'}, 'data': {'y': 3}})
+    append_json_file(filename, {'z': 1}, preserve = False, lock = True, list_conflict = 'a')
+    print('group commit with conflict:', load_json_file(filename) == {'y': 2, 'x': {'l': [1, 2]}, 'z': 1})
+    try:
+        with lock_file(filename):
+            _commit_spool(filename, conflicting, 4, False, False)
+        print('conflict reported to its appender: False')
+    except vbrExceptions.OtherException:
+        print('conflict reported to its appender: True')
+
+    missing = output_dir / 'missing.json'
+    try:
+        append_json_file(missing, {'a': 1}, lock = True)
+    except FileNotFoundError:
+        pass
+    print('failed append not spooled:', not list(Path(str(missing) + '.spool').glob('*')))
+
+
+_UNPICKLED = []
+
+
+class _Unpickled:    #pylint: disable=too-few-public-methods #only built by unpickling
+    """Object recording it was unpickled."""
+    def __reduce__(self):
+        return _UNPICKLED.append, ('unpickled',)
+
+
+def _test_snapshot(output_dir):
+    """Test snapshots: content reloaded as saved, a snapshot file holding a pickle never unpickled."""
+    data = {'a': {1: [1, 2.5, None, True, 'x']}}
+    filename = output_dir / 'snapshot.json'
+    save_json_file(data, filename, preserve = False, snapshot = True)
+    print('snapshot reloaded:', load_json_file(filename) == data)
+    states = _snapshot_states(filename)
+    _snapshot_file(filename).write_bytes(_SNAPSHOT_MAGIC + pickle.dumps({'file': states[0], 'journal': 0})
+                                         + pickle.dumps(_Unpickled()))
+    print('pickle snapshot not unpickled:', load_json_file(filename) == data and not _UNPICKLED)
+
+
+def _test_indented(output_dir):
+    """Test indented json: same text as json.dump, for containers of scalars, nested & empty ones."""
+    data = {'rows': [{'a': 1, 'b': 'x\n{"y": [1, 2]}', 'c': None}, {'a': 2.5, 'b': [], 'c': {1: True, 2: {}}}],
+            1: ('t', 'é'), 'empty': {}, 'nested': [[[]], [{'z': [1]}]]}
+    filename = output_dir / 'indented.json'
+    save_json_file(data, filename, preserve = False)
+    print('indented as json.dump:', filename.read_text(encoding = 'utf-8') == json.dumps(data, indent = 4))
+
+
+def _test_bytes(output_dir):
+    """Test bytes-like values: not saved as lists of int, json raising TypeError as for any unsupported type."""
+    filename = output_dir / 'bytes.json'
+    saved = []
+    for value in (b'ab', bytearray(b'ab'), memoryview(b'ab')):
+        for save in (lambda data: save_json_file(data, filename, preserve = False),
+                     lambda data: save_json_file(data, filename, preserve = False, indent = None),
+                     lambda data: save_json_stream(data, filename, preserve = False)):
+            try:
+                save({'v': value})
+                saved.append(type(value).__name__)
+            except TypeError:
+                pass
+    print('bytes-like raising TypeError:', not saved, saved)
+
+
+def _test_select(output_dir):
+    """Test path queries: list items selected in list order, same result from data & from lazy json file."""
+    data = {'l': ['a', 'b', 'c', 'd'], 't': [{'n': 0, 'v': 'x'}, {'n': 1, 'v': 'y'}, {'n': 2, 'v': 'z'}]}
+    filename = output_dir / 'select.json'
+    save_json_file(data, filename, preserve = False)
+    queries = [('l[3]', 'l[1]'), ('t.2.v', 't.0.n'), ('t.*.v', 't.1')]
+    expected = [{'l': ['b', 'd']}, {'t': [{'n': 0}, {'v': 'z'}]}, {'t': [{'v': 'x'}, {'n': 1, 'v': 'y'}, {'v': 'z'}]}]
+    with LazyJsonFile(filename) as json_file:
+        for query, result in zip(queries, expected):
+            print('select', query, select(data, *query) == result, json_file.select(*query) == result)
+
+
+def _paths(value, keys = ()):
+    """All key paths of a nested value, including paths of list items (and a missing index of each list)"""
+    yield list(keys)
+    if isinstance(value, dict):
+        for key, sub_value in value.items():
+            yield from _paths(sub_value, keys + (key,))
+    elif isinstance(value, list):
+        for index, sub_value in enumerate(value):
+            yield from _paths(sub_value, keys + (index,))
+        yield list(keys + (len(value),))
+
+
+def _value_at(value, keys):
+    """Value at a key path of a nested value - None if missing"""
+    for key in keys:
+        if isinstance(value, dict) and key in value:
+            value = value[key]
+        elif isinstance(value, list) and isinstance(key, int) and key < len(value):
+            value = value[key]
+        else:
+            return None
+    return value
+
+
+def _test_lazy_journal(output_dir, patch = False):
+    """Test LazyJsonFile.get() on files with a journal (appended content, and patches if requested,
+    list items included) against load_json_file()."""
+    rnd = random.Random(0)
+    filename = output_dir / 'lazy_journal.json'
+    errors = checked = 0
+    for _ in range(200):
+        content = {f'k{key}': [{'n': rnd.randint(0, 9)} for _ in range(rnd.randint(0, 3))]
+                   for key in range(rnd.randint(0, 3))}
+        save_json_file(content, filename, preserve = False)
+        for _ in range(rnd.randint(1, 3)):
+            new_content = {f'k{rnd.randint(0, 4)}': [{'n': rnd.randint(0, 9)}, rnd.randint(0, 9)]}
+            if not patch or rnd.random() < 0.5:
+                append_json_file(filename, new_content, journal = True, list_conflict = 'a')
+            else:
+                # content changed & list items appended, saved as a patch
+                content = load_json_file(filename)
+                patched = copy.deepcopy(content)
+                for key, items in new_content.items():
+                    patched.setdefault(key, []).extend(items)
+                    patched[key][0] = {'n': -1}
+                save_json_file(patched, filename, patch = True)
+        loaded = load_json_file(filename)
+        with LazyJsonFile(filename) as json_file:
+            for keys in _paths(loaded):
+                checked += 1
+                if json_file.get(keys) != _value_at(loaded, keys):
+                    errors += 1
+    print('lazy get with journal' + (' & patches' if patch else '') + ', same as loaded:', errors == 0,
+          f'({checked} paths)')
+
+
+def _main():
+    """Main function to test dicjsontools functions."""
     print(create_nested_dict(['a', 'b', 'c'], "here's my value"))
+
+    output_dir = Path('tests/outputs/dicjsontools')
+    shutil.rmtree(output_dir, ignore_errors = True)
+    output_dir.mkdir(parents = True)
+    _test_append_lock(output_dir)
+    _test_snapshot(output_dir)
+    _test_indented(output_dir)
+    _test_bytes(output_dir)
+    _test_select(output_dir)
+    _test_lazy_journal(output_dir)
+    _test_lazy_journal(output_dir, patch = True)
+
+if __name__ == "__main__":
+    # run the test
+    _main()
@@ -2,9 +2,80 @@
 test exceltojson functions
 '''
 
+import shutil
 import sys
+from pathlib import Path
 from time import sleep
+from openpyxl import Workbook
+from openpyxl.worksheet.table import Table
 from vbrpytools import exceltojson
+from vbrpytools import exceptions as vbrExceptions
+from vbrpytools.dicjsontools import load_json_file
+
+
+def _test_cache_eviction():
+    """Test a cache too small for all tables: a cached table is evicted by storing a missing one before
+    its rows are read."""
+    cache_dir = Path('tests/outputs/cache')
+    shutil.rmtree(cache_dir, ignore_errors = True)
+    exceltojson.convert_workbook('tests/resources/test.xlsx', ['suivi'], 'tests/outputs/cache.json',
+                                 cache = exceltojson.TableCache(cache_dir))
+    cache_size = sum(entry.stat().st_size for entry in cache_dir.glob('*.rows'))
+    cache = exceltojson.TableCache(cache_dir, max_size = cache_size)
+    exceltojson.convert_workbook('tests/resources/test.xlsx', ['other', 'suivi'], 'tests/outputs/cache.json',
+                                 cache = cache)
+    print('cache eviction:', cache.hits == 1 and cache.misses == 1,
+          sorted(load_json_file('tests/outputs/cache.json')) == ['other', 'suivi'])
+
+
+def _test_failed_conversion():
+    """Test a conversion failing while rows are written: existing outputs are kept as they were."""
+    outputfile = Path('tests/outputs/failed.json')
+    for output_format in exceltojson.OUTPUT_FORMATS:
+        exceltojson.convert_workbook('tests/resources/test.xlsx', ['suivi'], outputfile, output_format = output_format)
+        written = {file: file.read_bytes() for file in outputfile.parent.glob('failed*')}
+        for append in (False, True):
+            try:
+                exceltojson.convert_workbook('tests/resources/test.xlsx', ['suivi'], outputfile, append = append,
+                                             output_format = output_format, schema = {'commentaire': 'int'})
+            except vbrExceptions.OtherException:
+                pass
+            print(f'failed {output_format} conversion (append {append}) kept outputs:',
+                  {file: file.read_bytes() for file in outputfile.parent.glob('failed*')} == written)
+
+
+def _test_inferred_schema():
+    """Test inferred column types: a later value not matching is kept as read, while an explicit type raises."""
+    filename = Path('tests/outputs/inferred.xlsx')
+    filename.parent.mkdir(parents = True, exist_ok = True)
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(['id', 'count'])
+    for row in range(1, 1101):
+        sheet.append([row, row if row <= 1000 else 'n/a'])
+    sheet.add_table(Table(displayName = 'counts', ref = 'A1:B1101'))
+    workbook.save(filename)
+
+    with exceltojson.ExcelWorkbook(filename) as wb:
+        rows = wb.dict_from_table('counts', schema = 'infer')
+        print('inferred type, later value kept:', rows[0]['count'] == 1 and rows[-1]['count'] == 'n/a')
+        try:
+            wb.dict_from_table('counts', schema = {'count': 'int'})
+            print('explicit type, later value raising: False')
+        except vbrExceptions.OtherException:
+            print('explicit type, later value raising: True')
+
+
+def _test_duplicate_stems():
+    """Test a batch of excel files with the same name in different directories: refused before any conversion."""
+    for sub_dir in ('a', 'b'):
+        Path('tests/outputs/batch', sub_dir).mkdir(parents = True, exist_ok = True)
+        shutil.copy('tests/resources/test.xlsx', Path('tests/outputs/batch', sub_dir))
+    try:
+        exceltojson.convert_workbooks('tests/outputs/batch/*/test.xlsx', ['suivi'], 'tests/outputs/batch/json')
+        print('duplicate stems refused: False')
+    except vbrExceptions.OtherException:
+        print('duplicate stems refused:', not Path('tests/outputs/batch/json').exists())
 
 
 def _main():
@@ -32,6 +103,25 @@ def _main():
                 '-p']
     exceltojson._main() #pylint: disable=protected-access #accessed for test purpose only
 
+    # one json lines file per table, then rows appended at their end
+    sys.argv = [sys.argv[0],
+                '-f', 'tests/resources/test.xlsx',
+                '-t', 'suivi,other',
+                '-o', 'tests/outputs/output.json',
+                '--format', 'jsonl']
+    exceltojson._main() #pylint: disable=protected-access #accessed for test purpose only
+    sys.argv = [sys.argv[0],
+                '-f', 'tests/resources/test.xlsx',
+                '-t', 'other',
+                '-o', 'tests/outputs/output.json',
+                '--format', 'jsonl', '-a']
+    exceltojson._main() #pylint: disable=protected-access #accessed for test purpose only
+
+    _test_cache_eviction()
+    _test_failed_conversion()
+    _test_inferred_schema()
+    _test_duplicate_stems()
+
 if __name__ == "__main__":
     # run the test
     _main()
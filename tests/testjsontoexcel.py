@@ -0,0 +1,54 @@
+'''
+test jsontoexcel functions
+'''
+
+import math
+import sys
+from collections.abc import Mapping
+from vbrpytools import exceltojson, jsontoexcel
+
+
+def _same(value_a, value_b):
+    """Compare values read from excel files, floats being equal up to the precision excel files store."""
+    if isinstance(value_a, float) and isinstance(value_b, float):
+        return math.isclose(value_a, value_b, rel_tol = 1e-14)
+    if isinstance(value_a, Mapping) and isinstance(value_b, Mapping):
+        return value_a.keys() == value_b.keys() and all(_same(value_a[key], value_b[key]) for key in value_a)
+    if isinstance(value_a, list) and isinstance(value_b, list):
+        return len(value_a) == len(value_b) and all(map(_same, value_a, value_b))
+    return value_a == value_b
+
+
+def _test_single_value_lists():
+    """Test multi-value lists of one number: written as a number, read back as a list of this number."""
+    rows = [{'id': 1, 'tags': [5]}, {'id': 2, 'tags': ['a', 'b']}, {'id': 3, 'tags': ['c']}]
+    jsontoexcel.save_excel_file({'tags': rows}, 'tests/outputs/lists.xlsx', preserve = False)
+    with exceltojson.ExcelWorkbook('tests/outputs/lists.xlsx', read_only=True) as wb_out:
+        print('single value lists same rows:', wb_out.dict_from_table('tags') == rows)
+
+
+def _main():
+    """Main function to test jsontoexcel functions."""
+    sys.argv = [sys.argv[0],
+                '-f', 'tests/resources/test.xlsx',
+                '-t', 'suivi,other',
+                '-o', 'tests/outputs/output.json']
+    exceltojson._main() #pylint: disable=protected-access #accessed for test purpose only
+
+    sys.argv = [sys.argv[0],
+                '-f', 'tests/outputs/output.json',
+                '-o', 'tests/outputs/output.xlsx',
+                '-p']
+    jsontoexcel._main() #pylint: disable=protected-access #accessed for test purpose only
+
+    with exceltojson.ExcelWorkbook('tests/resources/test.xlsx', read_only=True) as wb_in, \
+         exceltojson.ExcelWorkbook('tests/outputs/output.xlsx', read_only=True) as wb_out:
+        for table_name in ['suivi', 'other']:
+            print(table_name, 'same rows:', _same(wb_in.dict_from_table(table_name),
+                                                  wb_out.dict_from_table(table_name)))
+
+    _test_single_value_lists()
+
+if __name__ == "__main__":
+    # run the test
+    _main()